@@ -1,158 +1,174 @@
 import datetime
-import json
 import time
+from typing import Callable, Dict, Optional, Tuple
 
-from arr_client import build_arr_client
-from flask import Flask, request
+from flask import Blueprint, Flask, current_app, request
 
+from approval_service import ApprovalService
+from approval_tokens import is_unfurler
 from config import load_config
-from notifications import build_notifier
-from qbittorrent_client import build_qbit_client
-
-app = Flask(__name__)
+from events import GrabEvent, parse_json, sniff_event_type
 
 LOGFILE = "received_webhooks.log"
-CFG = load_config("./config.yml")
-notifier = build_notifier(CFG)
-qbt = build_qbit_client(CFG)
-arr = build_arr_client(CFG)
-rules = CFG.rules
 
-# ---------- Webhook + approval endpoints ----------
+bp = Blueprint("approvarr", __name__)
 
 
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    ts = datetime.datetime.now().isoformat()
-    headers = dict(request.headers)
+def create_app(config_path: Optional[str] = None, start_services: bool = True) -> Flask:
+    """
+    Application factory. Pre-forking servers (see serve.py) pass
+    start_services=False and call `service.start()` in each worker after fork.
+    """
+    cfg = load_config(config_path)
 
-    try:
-        payload = request.get_json(force=True, silent=True)
-    except Exception:
-        payload = None
+    app = Flask(__name__)
+    app.extensions["approvarr"] = ApprovalService(cfg)
+    app.register_blueprint(bp)
 
-    raw_body = request.data.decode("utf-8", errors="replace")
+    if start_services:
+        app.extensions["approvarr"].start()
+    return app
 
-    entry = {
-        "timestamp": ts,
-        "headers": headers,
-        "payload": payload,
-        "raw_body": raw_body,
-    }
 
-    # Log everything for debugging
-    print("\n===== NEW WEBHOOK =====")
-    print(json.dumps(entry, indent=2))
-    print("=======================\n")
+def get_service() -> ApprovalService:
+    return current_app.extensions["approvarr"]
 
-    with open(LOGFILE, "a") as f:
-        f.write(json.dumps(entry, indent=2))
-        f.write("\n\n")
 
-    # --- Approvarr logic starts here ---
-    if not payload:
-        return "No JSON payload", 400
+# ---------- Webhook + approval endpoints ----------
 
-    event_type = payload.get("eventType")
-    if event_type != "Grab":
-        # Ignore non-Grab events for now
-        return "Ignored (not Grab)", 200
 
-    release = payload.get("release") or {}
-    app = payload.get("instanceName")
-    indexer = release.get("indexer")
-    release_title = release.get("releaseTitle") or release.get("title")
-    gib_size = int(release.get("size")) / (1024 ** 3)
-    release_size = f"{gib_size:.2f} GiB"
+def log_webhook(body: bytes) -> None:
+    """Append a handled webhook to LOGFILE (one line per event) for debugging."""
+    ts = datetime.datetime.now().isoformat()
+    with open(LOGFILE, "ab") as f:
+        f.write(ts.encode("ascii") + b" " + body.replace(b"\n", b" ") + b"\n")
 
-    download_id = payload.get("downloadId")
 
-    print(
-        f"eventType={event_type}, indexer={indexer}, title={release_title}, downloadId={download_id}"
-    )
+def handle_grab_event(payload: dict, body: bytes) -> Tuple[str, int]:
+    event = GrabEvent.from_payload(payload)
+    print(f"eventType=Grab, {event}")
+    log_webhook(body)
 
-    if not indexer:
+    if not event.indexer:
         return "no indexer", 400
 
-    # decide if needs approval or not
-    needs_approval = False
-    needs_pause = False
-    tags = []  # could be from multiple rules, though that would be weird
-    for rule in rules:
-        if (
-            rule.notify
-            and app.lower() in [app.lower() for app in rule.apps]
-            and indexer
-            in rule.indexer_matches  # TODO: use matcher fn here for either direct match or regex
-        ):
-            # these only apply if the rules matches!
-            needs_approval = True
-            if rule.pause_torrent:  # as soon as one rule wants pause, we do it.
-                needs_pause = True
-            for tag in rule.tags_to_add:
-                tags.append(tag)
-
-    if not download_id:
+    if not event.torrent_hash:
         print("No downloadId present; cannot tag by hash")
         return "OK (no downloadId)", 200
 
-    torrent_hash = download_id
+    if not get_service().enqueue_grab(event):
+        return "OK (duplicate)", 200
 
-    try:
-        qbt.login()
+    return "OK", 200
 
-        # Small delay in case Sonarr sent torrent and webhook in parallel
-        time.sleep(1)
 
-        # Tag & pause
-        if tags:
-            qbt.add_tags(torrent_hash, tags)
-            print("tags added")
-        if needs_pause:
-            qbt.pause(torrent_hash)
-            print("torrent paused")
+def handle_test_event(payload: dict, body: bytes) -> Tuple[str, int]:
+    print(f"Test webhook from {payload.get('instanceName')}")
+    return "OK (test)", 200
 
-        if notifier and needs_approval and release_title:
-            notifier.send_approval(
-                name=release_title, size=release_size, torrent_hash=torrent_hash, indexer=indexer
-            )
 
-    except Exception as e:
-        print(f"Error handling approval flow: {e}")
+# eventType -> handler; everything else is acknowledged and dropped unparsed
+EVENT_HANDLERS: Dict[str, Callable[[dict, bytes], Tuple[str, int]]] = {
+    "Grab": handle_grab_event,
+    "Test": handle_test_event,
+}
 
-    return "OK", 200
 
+@bp.route("/webhook", methods=["POST"])
+def webhook():
+    started = time.perf_counter()
+    body = request.get_data(cache=False)
+
+    # Fast path: most traffic is Download/Rename/Health/...; skip it before parsing
+    event_type = sniff_event_type(body)
+    if event_type is not None and event_type not in EVENT_HANDLERS:
+        return _timed(f"Ignored ({event_type})", 200, started)
+
+    payload = parse_json(body)
+    if not payload:
+        return _timed("No JSON payload", 400, started)
 
-@app.route("/approve/<torrent_hash>", methods=["GET"])
+    event_type = payload.get("eventType")
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler is None:
+        return _timed(f"Ignored ({event_type})", 200, started)
+
+    parsed = time.perf_counter()
+    text, status = handler(payload, body)
+    return _timed(text, status, started, parsed)
+
+
+def _timed(text: str, status: int, started: float, parsed: Optional[float] = None):
+    """Report parse (and handler) cost via Server-Timing."""
+    now = time.perf_counter()
+    if parsed is None:
+        timing = f"parse;dur={(now - started) * 1000:.3f}"
+    else:
+        timing = (
+            f"parse;dur={(parsed - started) * 1000:.3f}, "
+            f"handle;dur={(now - parsed) * 1000:.3f}"
+        )
+    return text, status, {"Server-Timing": timing}
+
+
+def check_action_link(action: str, torrent_hash: str):
+    """
+    Cheap gate in front of approve/reject: refuse HEAD probes and link-preview
+    bots, then verify the signed token. Returns an error response or None.
+    """
+    if request.method == "HEAD" or is_unfurler(request.headers.get("User-Agent")):
+        return "Link previews are not allowed\n", 403
+    if not get_service().signer.verify(action, torrent_hash, request.args.get("token")):
+        return "Invalid or expired link\n", 403
+    return None
+
+
+@bp.route("/approve/<torrent_hash>", methods=["GET"])
 def approve(torrent_hash):
+    denied = check_action_link("approve", torrent_hash)
+    if denied:
+        return denied
+
+    service = get_service()
     try:
-        qbt.login()
-        qbt.remove_tag(torrent_hash, "needs-approval")
-        # optionally you can call setCategory here if you want
-        qbt.add_tags(torrent_hash, ["approved"])
-        qbt.resume(torrent_hash)
+        service.approve_torrent(torrent_hash)
+        service.scheduler.resolve(torrent_hash.lower())
         return f"Approved {torrent_hash}\n", 200
     except Exception as e:
-        return f"Error approving: {e}\n", 500
+        # the click is already authenticated; apply it once qBittorrent is back
+        service.queue_decision("approve", torrent_hash.lower())
+        return f"Error approving: {e}\nQueued; it will be applied automatically.\n", 202
 
 
-@app.route("/reject/<torrent_hash>", methods=["GET"])
+@bp.route("/reject/<torrent_hash>", methods=["GET"])
 def reject(torrent_hash):
+    denied = check_action_link("reject", torrent_hash)
+    if denied:
+        return denied
+
+    service = get_service()
     try:
-        qbt.login()
-        qbt.delete(torrent_hash, delete_files=True)
-        print("torrent deleted")
-        # if arr:
-        #     arr.remove_by_download_id(
-        #         download_id=torrent_hash,
-        #         blocklist=True,               # INFO: there doesn't seem to be a reason for this, radar/sonarr figures it out pretty well
-        #         remove_from_client=False,     #       when you delete a torrent from qbt
-        #     )
-        #     print("download removed from arr app")
+        service.reject_torrent(torrent_hash)
+        service.scheduler.resolve(torrent_hash.lower())
         return f"Rejected {torrent_hash}\n", 200
     except Exception as e:
-        return f"Error rejecting: {e}\n", 500
+        # the click is already authenticated; apply it once qBittorrent is back
+        service.queue_decision("reject", torrent_hash.lower())
+        return f"Error rejecting: {e}\nQueued; it will be applied automatically.\n", 202
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    return get_service().render_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True, use_reloader=False)
+    # Development server only; use `python serve.py` in production.
+    app = create_app()
+    server = app.extensions["approvarr"].cfg.server
+    app.run(
+        host=server.get("host", "0.0.0.0"),
+        port=server.get("port", 5001),
+        debug=server.get("debug", False),
+        use_reloader=False,
+    )
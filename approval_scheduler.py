@@ -0,0 +1,275 @@
+# approval_scheduler.py
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from state_backend import StateBackend
+
+
+@dataclass
+class PendingApproval:
+    torrent_hash: str
+    name: str = ""
+    size: str = ""
+    indexer: str = ""
+    app: str = ""
+    deadline: Optional[float] = None  # unix timestamp; None = no auto-decision
+    on_timeout: str = "deny"  # allow | deny
+    on_error: str = "allow"  # allow | deny | require_approval
+    pause_torrent: bool = False  # hold the torrent stopped while pending
+    hold: Optional[str] = None  # pause | throttle | None (older entries: see pause_torrent)
+    download_limit: int = 0  # throttle hold only; bytes/s, 0 = unlimited
+    upload_limit: int = 0
+    notified: bool = False
+    notified_at: Optional[float] = None  # when the current approve/reject links were sent
+    created_at: float = field(default_factory=time.time)
+
+    def mark_notified(self) -> None:
+        self.notified = True
+        self.notified_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PendingApproval":
+        # ignore keys written by newer/older versions
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class ApprovalScheduler:
+    """
+    Tracks pending approvals and fires `on_expire` once a deadline passes.
+
+    One background thread sleeps on a min-heap of deadlines, so thousands of
+    pending torrents cost one heap entry each rather than one thread each.
+    Cancelled/rescheduled entries are dropped lazily when they reach the top.
+    If `on_expire` raises, the entry is retried after `retry_delay_seconds`.
+
+    The backend is the source of truth and may be shared by several replicas:
+    each one reloads it every `sync_interval_seconds`, and an expiring entry
+    is claimed by deleting it from the backend, so exactly one replica acts.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        on_expire: Callable[[PendingApproval], None],
+        retry_delay_seconds: float = 60.0,
+        sync_interval_seconds: float = 30.0,
+    ):
+        self._backend = backend
+        self._on_expire = on_expire
+        self._retry_delay = retry_delay_seconds
+        self._sync_interval = sync_interval_seconds
+        self._next_sync = 0.0
+        self._pending: Dict[str, PendingApproval] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._scheduled: Dict[str, float] = {}  # hash -> deadline of its live heap entry
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ------------- lifecycle -------------
+
+    def start(self) -> None:
+        """Reload persisted approvals and start the timer thread."""
+        self.sync()
+        print(f"[SCHED] restored {len(self)} pending approval(s)")
+        with self._cond:
+            self._stopping = False
+
+        self._thread = threading.Thread(
+            target=self._run, name="approval-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def request_stop(self) -> None:
+        """Signal the timer thread to exit without waiting for it."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.request_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ------------- public API -------------
+
+    def add(self, pending: PendingApproval) -> None:
+        """Track (or replace) a pending approval and persist it."""
+        self._backend.put_pending(pending.torrent_hash, pending.deadline, pending.to_dict())
+        with self._cond:
+            self._track(pending)
+            self._cond.notify()
+
+    def update(self, pending: PendingApproval) -> None:
+        """Persist changed fields (e.g. `notified`) for an already tracked approval."""
+        self.add(pending)
+
+    def resolve(self, torrent_hash: str) -> bool:
+        """Stop tracking a torrent (approved, rejected or removed). True if it was pending."""
+        with self._cond:
+            self._pending.pop(torrent_hash, None)
+            self._scheduled.pop(torrent_hash, None)
+        return self._backend.delete_pending(torrent_hash)
+
+    def sync(self) -> None:
+        """Replace the local view with the backend's (picks up other replicas' changes)."""
+        records = [PendingApproval.from_dict(d) for d in self._backend.load_pending()]
+        with self._cond:
+            self._pending = {p.torrent_hash: p for p in records}
+            self._scheduled = {
+                p.torrent_hash: p.deadline for p in records if p.deadline is not None
+            }
+            self._heap = [
+                (deadline, next(self._seq), h) for h, deadline in self._scheduled.items()
+            ]
+            heapq.heapify(self._heap)
+            self._next_sync = time.time() + self._sync_interval
+            self._cond.notify()
+
+    def get(self, torrent_hash: str) -> Optional[PendingApproval]:
+        with self._cond:
+            return self._pending.get(torrent_hash)
+
+    def fetch(self, torrent_hash: str) -> Optional[PendingApproval]:
+        """
+        Like get(), but reads the backend, so approvals added or resolved by
+        another replica since the last sync are seen immediately.
+        """
+        data = self._backend.get_pending(torrent_hash)
+        with self._cond:
+            if data is None:
+                self._pending.pop(torrent_hash, None)
+                self._scheduled.pop(torrent_hash, None)
+                return None
+            pending = PendingApproval.from_dict(data)
+            self._track(pending)
+            return pending
+
+    def __contains__(self, torrent_hash: str) -> bool:
+        with self._cond:
+            return torrent_hash in self._pending
+
+    def all(self) -> List[PendingApproval]:
+        with self._cond:
+            return list(self._pending.values())
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    # ------------- internals -------------
+
+    def _track(self, pending: PendingApproval) -> None:
+        """Caller must hold self._cond."""
+        torrent_hash = pending.torrent_hash
+        self._pending[torrent_hash] = pending
+        if pending.deadline is None:
+            self._scheduled.pop(torrent_hash, None)
+        elif self._scheduled.get(torrent_hash) != pending.deadline:
+            heapq.heappush(self._heap, (pending.deadline, next(self._seq), torrent_hash))
+            self._scheduled[torrent_hash] = pending.deadline
+
+        # lazy deletion leaves stale heap entries behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [
+                (deadline, next(self._seq), h) for h, deadline in self._scheduled.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self) -> List[PendingApproval]:
+        """
+        Block until at least one deadline passes and return every due entry,
+        or return [] when a sync is due. Caller holds the lock.
+        """
+        while not self._stopping:
+            until_sync = self._next_sync - time.time()
+            if until_sync <= 0:
+                return []
+
+            if not self._heap:
+                self._cond.wait(until_sync)
+                continue
+
+            deadline, _, torrent_hash = self._heap[0]
+            if self._scheduled.get(torrent_hash) != deadline:
+                heapq.heappop(self._heap)  # stale entry
+                continue
+
+            delay = deadline - time.time()
+            if delay > 0:
+                self._cond.wait(min(delay, until_sync))
+                continue
+
+            due: List[PendingApproval] = []
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, torrent_hash = heapq.heappop(self._heap)
+                if self._scheduled.get(torrent_hash) == deadline:
+                    del self._scheduled[torrent_hash]
+                    due.append(self._pending.pop(torrent_hash))
+            return due
+
+        return []
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._pop_due()
+                if self._stopping:
+                    return
+
+            if not due:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"[SCHED] sync failed: {e}")
+                    with self._cond:
+                        self._next_sync = time.time() + self._sync_interval
+                continue
+
+            for pending in due:
+                try:
+                    claimed = self._backend.delete_pending(pending.torrent_hash)
+                except Exception as e:
+                    print(f"[SCHED] could not claim {pending.torrent_hash}: {e}")
+                    self._retry_later(pending)
+                    continue
+                if not claimed:
+                    continue  # resolved elsewhere (approved, or another replica claimed it)
+                try:
+                    self._on_expire(pending)
+                except Exception as e:
+                    print(f"[SCHED] timeout action for {pending.torrent_hash} failed: {e}")
+                    self._retry_later(pending)
+
+    def _retry_later(self, pending: PendingApproval) -> None:
+        """Reschedule after `retry_delay_seconds`; never raises, so the timer thread survives."""
+        print(f"[SCHED] retrying {pending.torrent_hash} in {self._retry_delay:.0f}s")
+        pending.deadline = time.time() + self._retry_delay
+        try:
+            self.add(pending)
+        except Exception as e:
+            # the backend is down too; keep it in memory until the next sync
+            print(f"[SCHED] could not persist retry for {pending.torrent_hash}: {e}")
+            with self._cond:
+                self._track(pending)
+
+
+def build_scheduler(
+    backend: StateBackend,
+    on_expire: Callable[[PendingApproval], None],
+    sync_interval_seconds: float = 30.0,
+) -> ApprovalScheduler:
+    return ApprovalScheduler(backend, on_expire, sync_interval_seconds=sync_interval_seconds)
@@ -0,0 +1,446 @@
+# approval_service.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from approval_scheduler import ApprovalScheduler, PendingApproval, build_scheduler
+from approval_tokens import build_signer
+from arr_client import build_arr_client
+from config import ApprovarrConfig
+from coordination import LeaderElector, QueueWorker, make_owner_id
+from events import GrabEvent
+from notifications import build_notifier
+from outbox import OUTBOX_QUEUE, Outbox
+from qbittorrent_client import APPROVED_TAG, NEEDS_APPROVAL_TAG, build_qbit_client
+from reconciler import Reconciler, build_reconciler
+from resilience import STATE_VALUES, CircuitBreaker, CircuitOpenError, guarded
+from rule_engine import evaluate_rules
+from state_backend import StateBackend, build_state_backend
+from throttle import THROTTLE, apply_limits, clear_limits, has_budget, hold_limits
+
+GRAB_QUEUE = "grab"
+
+
+class ApprovalService:
+    """
+    Everything the routes need, built from one config.
+
+    Construction is cheap and fork-safe (no threads, no open state backend),
+    so a pre-forking server can build it once in the master. `start()` opens
+    the backend and starts the background threads and must run in each
+    worker process; `stop()` drains in-flight work.
+    """
+
+    def __init__(self, cfg: ApprovarrConfig):
+        self.cfg = cfg
+        self.rules = cfg.rules
+        self.gate = cfg.gate
+        # where approved torrents go; None = leave the category alone
+        self.release_category = cfg.gate.release_category if cfg.gate.enabled else None
+        self.signer = build_signer(cfg)
+
+        # fail fast instead of burning the request timeout while a dependency is down
+        b = cfg.behavior
+        self.breakers = {
+            name: CircuitBreaker(name, b.breaker_failure_threshold, b.breaker_reset_seconds)
+            for name in ("qbittorrent", f"notifier:{cfg.notifications.provider}")
+        }
+        # every QbitClient method logs in itself; a direct login() is usually a no-op
+        self.qbt = guarded(
+            build_qbit_client(cfg),
+            self.breakers["qbittorrent"],
+            passthrough=("login", "ensure_login"),
+        )
+        # no breaker: ArrClient logs and skips unreachable instances itself
+        self.arr = build_arr_client(cfg)
+        self.notifier = guarded(
+            build_notifier(cfg, self.signer),
+            self.breakers[f"notifier:{cfg.notifications.provider}"],
+        )
+
+        self.owner_id: Optional[str] = None
+        self.backend: Optional[StateBackend] = None
+        self.scheduler: Optional[ApprovalScheduler] = None
+        self.grab_worker: Optional[QueueWorker] = None
+        self.outbox: Optional[Outbox] = None
+        self.leader: Optional[LeaderElector] = None
+        self.reconciler: Optional[Reconciler] = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    # ------------- lifecycle -------------
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.backend is not None:
+                return
+
+            # shared with any other replicas pointed at the same state backend
+            self.owner_id = make_owner_id()
+            self.backend = build_state_backend(self.cfg)
+            self._stopping.clear()
+
+            self.scheduler = build_scheduler(
+                self.backend, self.on_approval_timeout, self.cfg.state.sync_interval_seconds
+            )
+            self.scheduler.start()
+
+            self.grab_worker = QueueWorker(
+                self.backend,
+                GRAB_QUEUE,
+                self.handle_grab,
+                threads=self.cfg.state.workers,
+                lease_seconds=self.cfg.state.job_lease_seconds,
+                max_attempts=self.cfg.state.max_job_attempts,
+                on_give_up=self.on_grab_failed,
+                # while qBittorrent is down, grabs wait instead of using up retries
+                defer_on=(CircuitOpenError,),
+            )
+            self.grab_worker.start()
+
+            self.outbox = Outbox(
+                self.backend,
+                {
+                    "approve": self._outbox_approve,
+                    "reject": self._outbox_reject,
+                    "notify_approval": self._outbox_notify_approval,
+                },
+                max_attempts=self.cfg.behavior.outbox_max_attempts,
+                on_give_up=self._outbox_gave_up,
+            )
+            self.outbox.start()
+
+            # periodic tasks (and the one-off gate setup) run on whichever replica holds the lease
+            self.leader = LeaderElector(
+                self.backend,
+                "periodic",
+                self.owner_id,
+                self.cfg.state.leader_lease_seconds,
+                on_elected=self._setup_gate_while_leader if self.gate.enabled else None,
+            )
+            self.leader.start()
+
+            self.reconciler = build_reconciler(
+                self.qbt,
+                self.scheduler,
+                self.notifier,
+                self.cfg.behavior,
+                self.gate,
+                link_ttl_seconds=self.signer.ttl_seconds,
+            )
+            if self.cfg.behavior.reconcile_interval_seconds > 0:
+                self.reconciler.start(
+                    self.cfg.behavior.reconcile_interval_seconds,
+                    only_if=lambda: self.leader.is_leader,
+                )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Graceful shutdown: stop taking grab jobs and wait (up to `timeout` in
+        total) for the ones in flight. Queued jobs stay in the backend for the
+        next start.
+        """
+        with self._start_lock:
+            if self.backend is None:
+                return
+            print(f"[SERVICE] {self.owner_id} draining")
+            self._stopping.set()
+
+            # signal everything first so the components drain in parallel and
+            # the whole shutdown fits in one `timeout`
+            components = (
+                self.grab_worker, self.outbox, self.reconciler, self.scheduler, self.leader
+            )
+            for component in components:
+                component.request_stop()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for component in components:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                component.stop(remaining)
+            self.backend.close()
+            self.backend = None
+
+    def setup_gate(self) -> bool:
+        """
+        Create the gate category in qBittorrent and, if configured, point the
+        *Arr download clients at it. Best effort: the reconciler and the
+        per-grab pause still hold torrents if this fails. False if qBittorrent
+        could not be set up.
+        """
+        try:
+            self.qbt.ensure_category(self.gate.category, self.gate.save_path)
+            if self.release_category:
+                self.qbt.ensure_category(self.release_category)
+        except Exception as e:
+            print(f"[GATE] failed to set up qBittorrent category '{self.gate.category}': {e}")
+            return False
+
+        if self.gate.configure_arr and self.arr:
+            try:
+                self.arr.configure_gate(self.cfg.qbit.url, self.gate.category)
+            except Exception as e:
+                print(f"[GATE] failed to configure *Arr download clients: {e}")
+        return True
+
+    def _setup_gate_while_leader(self) -> None:
+        """Leader only: set up the gate, retrying every minute while qBittorrent is down."""
+        while self.leader.is_leader:
+            if self.setup_gate() or self._stopping.wait(60):
+                return
+
+    # ------------- approval actions (routes, timeouts and on_error) -------------
+
+    def approve_torrent(self, torrent_hash: str) -> None:
+        qbt = self.qbt
+        qbt.remove_tag(torrent_hash, NEEDS_APPROVAL_TAG)
+        qbt.add_tags(torrent_hash, [APPROVED_TAG])
+        # lift a soft hold's rate limits; a no-op for paused holds, and cheaper
+        # than looking up how the torrent was held on every click
+        clear_limits(qbt, torrent_hash)
+        qbt.release(torrent_hash, self.release_category)
+
+    def reject_torrent(self, torrent_hash: str) -> None:
+        self.qbt.delete(torrent_hash, delete_files=True)
+        print("torrent deleted")
+        # if arr:
+        #     arr.remove_by_download_id(
+        #         download_id=torrent_hash,
+        #         blocklist=True,               # INFO: there doesn't seem to be a reason for this, radar/sonarr figures it out pretty well
+        #         remove_from_client=False,     #       when you delete a torrent from qbt
+        #     )
+        #     print("download removed from arr app")
+
+    def on_approval_timeout(self, pending: PendingApproval) -> None:
+        """Called by the scheduler once a pending approval passes its deadline."""
+        if pending.on_timeout == "allow":
+            self.approve_torrent(pending.torrent_hash)
+            outcome = "auto-approved"
+        else:
+            self.reject_torrent(pending.torrent_hash)
+            outcome = "auto-rejected"
+        print(f"[SCHED] {pending.torrent_hash} {outcome} after timeout")
+
+        if self.notifier:
+            try:
+                self.notifier.send_info(
+                    title=f"Torrent {outcome}",
+                    message=f"{pending.name or pending.torrent_hash} was {outcome} (no response before timeout)",
+                )
+            except Exception as e:
+                print(f"Error sending timeout notification: {e}")
+
+    def apply_on_error(self, policy: str, torrent_hash: str) -> None:
+        """
+        Apply the rule's on_error policy after a qBittorrent/notifier failure:
+        - allow:            let the torrent through
+        - deny:             delete it
+        - require_approval: keep it held; the scheduler/timeout decides later
+        """
+        print(f"Applying on_error={policy} to {torrent_hash}")
+        if policy == "require_approval":
+            return
+
+        try:
+            if policy == "allow":
+                self.approve_torrent(torrent_hash)
+            elif policy == "deny":
+                self.reject_torrent(torrent_hash)
+        except Exception as e:
+            # qBittorrent is unreachable; apply the decision once it is back
+            print(f"Error applying on_error={policy} to {torrent_hash}: {e}")
+            self.queue_decision("approve" if policy == "allow" else "reject", torrent_hash)
+            return
+
+        self.scheduler.resolve(torrent_hash)
+
+    def queue_decision(self, action: str, torrent_hash: str) -> None:
+        """
+        Hand an approve/reject that could not be applied to the outbox. The
+        pending approval is resolved right away so its timeout cannot fire
+        the opposite decision while this one waits for qBittorrent.
+        """
+        self.outbox.push(action, torrent_hash=torrent_hash)
+        self.scheduler.resolve(torrent_hash)
+
+    # ------------- grab handling -------------
+
+    def enqueue_grab(self, event: GrabEvent) -> bool:
+        """Queue a Grab for the workers. False if this torrent was already queued."""
+        torrent_hash = event.torrent_hash
+        # *Arr retries webhooks; only the first delivery (on any replica) is queued
+        key = f"grab:{torrent_hash}"
+        if not self.backend.claim_once(key, self.cfg.state.dedupe_ttl_seconds):
+            print(f"Duplicate Grab for {torrent_hash}; already queued")
+            return False
+
+        try:
+            # Record the approval up front: an approve/reject click (or its outbox
+            # retry) may be handled before the delayed grab job runs, and the job
+            # must then see it as decided rather than hold the torrent again.
+            decision = evaluate_rules(self.rules, self.cfg.behavior, event.app, event.indexer)
+            if decision.needs_approval:
+                timeout = decision.approval_timeout_seconds
+                self.scheduler.add(
+                    PendingApproval(
+                        torrent_hash=torrent_hash,
+                        name=event.title,
+                        size=event.size,
+                        indexer=event.indexer,
+                        app=event.app,
+                        deadline=time.time() + timeout if timeout else None,
+                        on_timeout=decision.on_timeout,
+                        on_error=decision.on_error,
+                        pause_torrent=decision.needs_pause,
+                        hold=decision.hold,
+                        download_limit=decision.hold_download_limit,
+                        upload_limit=decision.hold_upload_limit,
+                    )
+                )
+
+            # Delay in case Sonarr sent torrent and webhook in parallel
+            self.backend.enqueue(
+                GRAB_QUEUE, event.to_dict(), delay_seconds=self.cfg.behavior.creation_delay_seconds
+            )
+        except Exception:
+            # nothing was queued: let the *Arr's retry of this webhook through
+            try:
+                self.backend.release_claim(key)
+            except Exception as e:
+                print(f"Failed to release Grab claim for {torrent_hash}: {e}")
+            raise
+        return True
+
+    def handle_grab(self, grab: Dict[str, Any]) -> None:
+        """
+        Queue worker for Grab events: tag, pause and notify.
+        Safe to retry; every step is idempotent and notify is skipped once sent.
+        """
+        event = GrabEvent.from_dict(grab)
+        torrent_hash = event.torrent_hash
+        decision = evaluate_rules(self.rules, self.cfg.behavior, event.app, event.indexer)
+        needs_approval = decision.needs_approval
+        needs_pause = decision.needs_pause
+        tags = decision.tags  # could be from multiple rules, though that would be weird
+        if needs_approval and NEEDS_APPROVAL_TAG not in tags:
+            # the reconciler finds held torrents by this tag
+            tags = tags + [NEEDS_APPROVAL_TAG]
+
+        pending = self.scheduler.fetch(torrent_hash) if needs_approval else None
+        if needs_approval and pending is None:
+            print(f"{torrent_hash} was already approved/rejected; not holding it")
+            return
+
+        qbt = self.qbt
+
+        # Tag & pause
+        if tags:
+            qbt.add_tags(torrent_hash, tags)
+            print("tags added")
+        if needs_pause:
+            # gated torrents arrive stopped already; this catches an *Arr not set up for the gate
+            qbt.pause(torrent_hash)
+            print("torrent paused")
+        elif decision.hold == THROTTLE:
+            self._throttle(pending)
+            print("torrent throttled")
+            if self.gate.enabled:
+                # start it, but keep it in the gate until approved
+                self._release_gated(torrent_hash, category=None)
+        elif self.gate.enabled:
+            self._release_gated(torrent_hash, self.release_category)
+
+        if self.notifier and needs_approval and event.title and not pending.notified:
+            try:
+                self.notifier.send_approval(
+                    name=event.title,
+                    size=event.size,
+                    torrent_hash=torrent_hash,
+                    indexer=event.indexer,
+                )
+            except Exception as e:
+                # the torrent is already held; deliver the notification once the provider is back
+                print(f"Error sending approval notification: {e}")
+                self.outbox.push("notify_approval", torrent_hash=torrent_hash)
+                return
+            pending.mark_notified()
+            self.scheduler.update(pending)
+
+    def _throttle(self, pending: PendingApproval) -> None:
+        """Apply soft-hold limits; with a global budget, re-split it over all throttled torrents."""
+        if has_budget(self.cfg.behavior):
+            # the local view (synced periodically) is close enough; the
+            # reconciler re-splits from a fresh sync on its next pass
+            pending_list = self.scheduler.all()
+        else:
+            pending_list = [pending]
+        apply_limits(self.qbt, hold_limits(pending_list, self.cfg.behavior))
+
+    def _release_gated(self, torrent_hash: str, category: Optional[str]) -> None:
+        """Start a torrent that arrived stopped in the gate category but needs no hard hold."""
+        torrents = self.qbt.list_all(hashes=torrent_hash)
+        if not torrents:
+            # not added yet; the job is retried with backoff
+            raise RuntimeError(f"{torrent_hash} not in qBittorrent yet")
+        if torrents[0].get("category") == self.gate.category:
+            self.qbt.release(torrent_hash, category)
+            print("torrent released from gate")
+
+    def on_grab_failed(self, grab: Dict[str, Any], error: Exception) -> None:
+        """The grab job ran out of retries; fall back to the rule's on_error policy."""
+        print(f"Error handling approval flow: {error}")
+        event = GrabEvent.from_dict(grab)
+        decision = evaluate_rules(self.rules, self.cfg.behavior, event.app, event.indexer)
+        if decision.needs_approval:
+            self.apply_on_error(decision.on_error, event.torrent_hash)
+
+    # ------------- outbox actions -------------
+
+    def _outbox_approve(self, torrent_hash: str) -> None:
+        self.approve_torrent(torrent_hash)
+        self.scheduler.resolve(torrent_hash)
+
+    def _outbox_reject(self, torrent_hash: str) -> None:
+        self.reject_torrent(torrent_hash)
+        self.scheduler.resolve(torrent_hash)
+
+    def _outbox_notify_approval(self, torrent_hash: str) -> None:
+        pending = self.scheduler.fetch(torrent_hash)
+        if pending is None or pending.notified or not self.notifier:
+            return  # decided (or notified by the reconciler) in the meantime
+        self.notifier.send_approval(
+            name=pending.name or torrent_hash,
+            size=pending.size,
+            torrent_hash=torrent_hash,
+            indexer=pending.indexer,
+        )
+        pending.mark_notified()
+        self.scheduler.update(pending)
+
+    def _outbox_gave_up(self, action: str, args: Dict[str, Any], error: Exception) -> None:
+        print(f"[OUTBOX] giving up on {action} {args}: {error}")
+        if action == "notify_approval":
+            pending = self.scheduler.fetch(args["torrent_hash"])
+            if pending is not None:
+                self.apply_on_error(pending.on_error, pending.torrent_hash)
+
+    # ------------- metrics -------------
+
+    def render_metrics(self) -> str:
+        """Prometheus text exposition of queue depths and breaker states."""
+        lines = []
+        if self.backend is not None:
+            now = time.time()
+            for queue in (GRAB_QUEUE, OUTBOX_QUEUE):
+                depth, oldest = self.backend.queue_stats(queue)
+                age = now - oldest if oldest else 0.0
+                lines.append(f'approvarr_queue_depth{{queue="{queue}"}} {depth}')
+                lines.append(f'approvarr_queue_oldest_age_seconds{{queue="{queue}"}} {age:.3f}')
+            lines.append(f"approvarr_pending_approvals {len(self.scheduler)}")
+
+        for name, breaker in self.breakers.items():
+            lines.append(
+                f'approvarr_circuit_state{{dependency="{name}"}} {STATE_VALUES[breaker.state]}'
+            )
+        return "\n".join(lines) + "\n"
@@ -3,11 +3,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from typing import Any, Dict, List
+from urllib.parse import urlparse
 
 import requests
 
 from config import ApprovarrConfig, ArrInstance
 
+# download-client setting holding the category, per *Arr type
+CATEGORY_FIELD = {"sonarr": "tvCategory", "radarr": "movieCategory"}
+# qBittorrent "Initial State" in the *Arr download-client settings (0 start, 1 force start)
+INITIAL_STATE_STOPPED = 2
+
 
 @dataclass
 class ArrClient:
@@ -77,6 +83,70 @@ class ArrClient:
                         f"[ARR] Failed to delete queue item {qid} from {inst.name}: {e}"
                     )
 
+    def _matches_qbit(self, client: Dict[str, Any], qbit_url: str) -> bool:
+        fields = {f["name"]: f.get("value") for f in client.get("fields", [])}
+        url = urlparse(qbit_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        return fields.get("host") == url.hostname and int(fields.get("port") or 0) == port
+
+    def configure_gate(self, qbit_url: str, category: str) -> None:
+        """
+        For each configured *Arr instance, point the qBittorrent download
+        client(s) at `qbit_url` to the gate category with the initial state
+        set to stopped, so new grabs arrive in qBittorrent without downloading.
+        """
+        for inst in self.instances:
+            base = self._base_url(inst)
+            try:
+                resp = self.session.get(
+                    f"{base}/api/v3/downloadclient", headers=self._headers(inst), timeout=5
+                )
+                resp.raise_for_status()
+                clients = resp.json()
+            except Exception as e:
+                print(f"[ARR] Failed to fetch download clients from {inst.name}: {e}")
+                continue
+
+            wanted = {CATEGORY_FIELD[inst.type]: category, "initialState": INITIAL_STATE_STOPPED}
+            matched = False
+            for client in clients:
+                if client.get("implementation") != "QBittorrent":
+                    continue
+                if not self._matches_qbit(client, qbit_url):
+                    continue
+                matched = True
+
+                fields = client.get("fields", [])
+                if all(f.get("value") == wanted[f["name"]] for f in fields if f["name"] in wanted):
+                    continue  # already set up
+                for f in fields:
+                    if f["name"] in wanted:
+                        f["value"] = wanted[f["name"]]
+
+                try:
+                    resp = self.session.put(
+                        f"{base}/api/v3/downloadclient/{client['id']}",
+                        headers=self._headers(inst),
+                        json=client,
+                        timeout=10,
+                    )
+                    print(
+                        f"[ARR] PUT downloadclient/{client['id']} on {inst.name} "
+                        f"-> {resp.status_code} {resp.text[:200]!r}"
+                    )
+                    resp.raise_for_status()
+                except Exception as e:
+                    print(
+                        f"[ARR] Failed to configure download client "
+                        f"{client.get('name')} on {inst.name}: {e}"
+                    )
+
+            if not matched:
+                print(
+                    f"[ARR] {inst.name} has no qBittorrent download client for {qbit_url}; "
+                    f"set its category to '{category}' by hand"
+                )
+
 
 def build_arr_client(cfg: ApprovarrConfig) -> ArrClient:
     instances = cfg.arr
@@ -38,6 +38,18 @@ class NotificationConfig:
 class BehaviorConfig:
     default_on_error: str = "allow"  # allow | deny | require_approval
     creation_delay_seconds: float = 1.0
+    approval_timeout_seconds: Optional[float] = None  # None = wait forever
+    default_on_timeout: str = "deny"  # allow | deny
+    reconcile_interval_seconds: float = 300.0  # 0 disables the reconciler
+    breaker_failure_threshold: int = 5  # consecutive failures before failing fast
+    breaker_reset_seconds: float = 30.0  # how long a tripped breaker stays open
+    outbox_max_attempts: int = 20
+    # soft hold: per-torrent limits (bytes/s, 0 = unlimited) for rules with hold: throttle
+    hold_download_limit: int = 102400
+    hold_upload_limit: int = 102400
+    # optional budget shared by all throttled pending torrents (bytes/s, None = no budget)
+    hold_total_download_limit: Optional[int] = None
+    hold_total_upload_limit: Optional[int] = None
 
 
 @dataclass
@@ -49,6 +61,38 @@ class RuleConfig:
     pause_torrent: bool = True
     notify: bool = True
     on_error: Optional[str] = None
+    approval_timeout_seconds: Optional[float] = None
+    on_timeout: Optional[str] = None
+    hold: Optional[str] = None  # pause | throttle | none; None = pause if pause_torrent
+    hold_download_limit: Optional[int] = None  # None = behavior default
+    hold_upload_limit: Optional[int] = None
+
+
+@dataclass
+class StateConfig:
+    backend: str = "sqlite"  # sqlite | redis
+    path: str = "approvarr_state.db"  # sqlite only
+    redis_url: Optional[str] = None  # redis only, e.g. redis://localhost:6379/0
+    key_prefix: str = "approvarr"
+    workers: int = 2  # grab worker threads per process
+    job_lease_seconds: float = 60.0
+    max_job_attempts: int = 5
+    dedupe_ttl_seconds: float = 3600.0
+    leader_lease_seconds: float = 30.0
+    sync_interval_seconds: float = 30.0  # how often each replica reloads pending approvals
+
+
+# Pre-pause mode: the *Arr hands torrents to qBittorrent in `category`,
+# already stopped, so nothing downloads until approvarr releases them.
+@dataclass
+class GateConfig:
+    enabled: bool = False
+    category: str = "approvarr-pending"
+    save_path: Optional[str] = None  # None = qBittorrent's default save path
+    # category approved torrents are moved to; None keeps them in `category`.
+    # The *Arr only tracks its own download-client category, so it must watch this one too.
+    release_category: Optional[str] = None
+    configure_arr: bool = False  # point the *Arr qBittorrent download clients at the gate on start
 
 
 @dataclass
@@ -59,6 +103,8 @@ class ApprovarrConfig:
     behavior: BehaviorConfig
     rules: List[RuleConfig]
     arr: List[ArrInstance]
+    state: StateConfig = field(default_factory=StateConfig)
+    gate: GateConfig = field(default_factory=GateConfig)
 
 
 # -------------------------
@@ -99,6 +145,16 @@ def load_config(path: Optional[str] = None) -> ApprovarrConfig:
     behavior_cfg = BehaviorConfig(
         default_on_error=beh.get("default_on_error", "allow"),
         creation_delay_seconds=beh.get("creation_delay_seconds", 1.0),
+        approval_timeout_seconds=beh.get("approval_timeout_seconds"),
+        default_on_timeout=beh.get("default_on_timeout", "deny"),
+        reconcile_interval_seconds=beh.get("reconcile_interval_seconds", 300.0),
+        breaker_failure_threshold=beh.get("breaker_failure_threshold", 5),
+        breaker_reset_seconds=beh.get("breaker_reset_seconds", 30.0),
+        outbox_max_attempts=beh.get("outbox_max_attempts", 20),
+        hold_download_limit=beh.get("hold_download_limit", 102400),
+        hold_upload_limit=beh.get("hold_upload_limit", 102400),
+        hold_total_download_limit=beh.get("hold_total_download_limit"),
+        hold_total_upload_limit=beh.get("hold_total_upload_limit"),
     )
 
     # ---- rules ----
@@ -114,12 +170,42 @@ def load_config(path: Optional[str] = None) -> ApprovarrConfig:
                 pause_torrent=r.get("pause_torrent", True),
                 notify=r.get("notify", True),
                 on_error=r.get("on_error"),
+                approval_timeout_seconds=r.get("approval_timeout_seconds"),
+                on_timeout=r.get("on_timeout"),
+                hold=r.get("hold"),
+                hold_download_limit=r.get("hold_download_limit"),
+                hold_upload_limit=r.get("hold_upload_limit"),
             )
         )
 
     # ---- server ----
     server_cfg = raw.get("server", {})
 
+    # ---- shared state ----
+    st = raw.get("state", {})
+    state_cfg = StateConfig(
+        backend=st.get("backend", "sqlite"),
+        path=st.get("path", "approvarr_state.db"),
+        redis_url=st.get("redis_url"),
+        key_prefix=st.get("key_prefix", "approvarr"),
+        workers=st.get("workers", 2),
+        job_lease_seconds=st.get("job_lease_seconds", 60.0),
+        max_job_attempts=st.get("max_job_attempts", 5),
+        dedupe_ttl_seconds=st.get("dedupe_ttl_seconds", 3600.0),
+        leader_lease_seconds=st.get("leader_lease_seconds", 30.0),
+        sync_interval_seconds=st.get("sync_interval_seconds", 30.0),
+    )
+
+    # ---- pre-pause gate ----
+    g = raw.get("gate", {})
+    gate_cfg = GateConfig(
+        enabled=g.get("enabled", False),
+        category=g.get("category", "approvarr-pending"),
+        save_path=g.get("save_path"),
+        release_category=g.get("release_category"),
+        configure_arr=g.get("configure_arr", False),
+    )
+
     # ---- arr client ----
     arr_raw = raw.get("arr", [])
     arr: List[ArrInstance] = []
@@ -141,6 +227,8 @@ def load_config(path: Optional[str] = None) -> ApprovarrConfig:
         behavior=behavior_cfg,
         rules=rules,
         arr=arr,
+        state=state_cfg,
+        gate=gate_cfg,
     )
 
     validate_config(config)
@@ -152,6 +240,8 @@ def load_config(path: Optional[str] = None) -> ApprovarrConfig:
 # -------------------------
 
 VALID_DEFAULT_BEHAVIORS = {"allow", "deny", "require_approval"}
+VALID_TIMEOUT_BEHAVIORS = {"allow", "deny"}
+VALID_HOLD_MODES = {"pause", "throttle", "none"}
 
 
 def validate_config(cfg: ApprovarrConfig):
@@ -165,14 +255,67 @@ def validate_config(cfg: ApprovarrConfig):
             f"Unknown notification provider '{cfg.notifications.provider}'"
         )
 
+    if not (cfg.server.get("approval_secret") or os.getenv("APPROVARR_APPROVAL_SECRET")):
+        raise ValueError(
+            "server.approval_secret (or APPROVARR_APPROVAL_SECRET) is required to sign "
+            "approve/reject links"
+        )
+
     if cfg.behavior.default_on_error not in VALID_DEFAULT_BEHAVIORS:
         raise ValueError(f"default_on_error must be one of {VALID_DEFAULT_BEHAVIORS}")
 
+    if cfg.behavior.default_on_timeout not in VALID_TIMEOUT_BEHAVIORS:
+        raise ValueError(f"default_on_timeout must be one of {VALID_TIMEOUT_BEHAVIORS}")
+
+    if (
+        cfg.behavior.approval_timeout_seconds is not None
+        and cfg.behavior.approval_timeout_seconds <= 0
+    ):
+        raise ValueError("approval_timeout_seconds must be positive")
+
+    if cfg.state.backend not in ("sqlite", "redis"):
+        raise ValueError(f"Unknown state backend '{cfg.state.backend}'")
+
+    if cfg.state.backend == "redis" and not cfg.state.redis_url:
+        raise ValueError("state.redis_url is required for the redis backend")
+
+    if cfg.state.workers < 1:
+        raise ValueError("state.workers must be at least 1")
+
+    for key in (
+        "hold_download_limit",
+        "hold_upload_limit",
+        "hold_total_download_limit",
+        "hold_total_upload_limit",
+    ):
+        value = getattr(cfg.behavior, key)
+        if value is not None and value < 0:
+            raise ValueError(f"{key} must not be negative")
+
+    if cfg.gate.enabled and not cfg.gate.category:
+        raise ValueError("gate.category is required when the gate is enabled")
+
+    if cfg.gate.enabled and cfg.gate.release_category == cfg.gate.category:
+        raise ValueError("gate.release_category must differ from gate.category")
+
     for rule in cfg.rules:
         if rule.on_error and rule.on_error not in VALID_DEFAULT_BEHAVIORS:
             raise ValueError(
                 f"Rule '{rule.name}' has invalid on_error '{rule.on_error}'"
             )
+        if rule.on_timeout and rule.on_timeout not in VALID_TIMEOUT_BEHAVIORS:
+            raise ValueError(
+                f"Rule '{rule.name}' has invalid on_timeout '{rule.on_timeout}'"
+            )
+        if rule.approval_timeout_seconds is not None and rule.approval_timeout_seconds <= 0:
+            raise ValueError(
+                f"Rule '{rule.name}' approval_timeout_seconds must be positive"
+            )
+        if rule.hold and rule.hold not in VALID_HOLD_MODES:
+            raise ValueError(f"Rule '{rule.name}' has invalid hold '{rule.hold}'")
+        for limit in (rule.hold_download_limit, rule.hold_upload_limit):
+            if limit is not None and limit < 0:
+                raise ValueError(f"Rule '{rule.name}' hold limits must not be negative")
 
     # You can add much more depending on how strict you want v1 to be.
     # TODO: warn on no provided arr clients
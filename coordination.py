@@ -0,0 +1,187 @@
+# coordination.py
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from state_backend import Job, StateBackend
+
+
+def make_owner_id() -> str:
+    """Unique id for this process, used for leases."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """
+    Holds a named lease in the backend and keeps renewing it. Exactly one
+    process across all replicas sees `is_leader == True` at a time (modulo
+    lease expiry), so periodic tasks guarded by it run once per cluster.
+    `on_elected` runs on its own thread each time this process takes the
+    lease, so slow one-off setup never delays lease renewal.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        name: str,
+        owner: str,
+        ttl_seconds: float = 30.0,
+        on_elected: Optional[Callable[[], None]] = None,
+    ):
+        self.backend = backend
+        self.name = name
+        self.owner = owner
+        self.ttl_seconds = ttl_seconds
+        self.on_elected = on_elected
+        self._leader = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+
+    def request_stop(self) -> None:
+        """Signal the thread to exit without waiting for it."""
+        self._stop.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.request_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._leader:
+            try:
+                self.backend.release_lease(self.name, self.owner)
+            except Exception as e:
+                print(f"[LEADER] failed to release {self.name}: {e}")
+            self._leader = False
+
+    def _run(self) -> None:
+        # renew well before the lease runs out
+        interval = self.ttl_seconds / 3
+        while True:
+            try:
+                leader = self.backend.acquire_lease(self.name, self.owner, self.ttl_seconds)
+            except Exception as e:
+                print(f"[LEADER] lease check failed: {e}")
+                leader = False
+            if leader != self._leader:
+                print(f"[LEADER] {self.owner} {'acquired' if leader else 'lost'} {self.name}")
+            elected = leader and not self._leader
+            self._leader = leader
+            if elected and self.on_elected:
+                threading.Thread(
+                    target=self.on_elected, name=f"elected-{self.name}", daemon=True
+                ).start()
+            if self._stop.wait(interval):
+                return
+
+
+class QueueWorker:
+    """
+    Pulls jobs from a backend queue on `threads` worker threads and hands
+    each payload to `handler`. Failed jobs are retried with exponential
+    backoff; after `max_attempts` they go to `on_give_up` and are dropped.
+    Exceptions listed in `defer_on` (e.g. an open circuit breaker) never
+    count as an attempt; the job waits for the error's `retry_after`.
+    Several processes/replicas can run workers against the same queue.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        queue: str,
+        handler: Callable[[Dict[str, Any]], None],
+        threads: int = 1,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        poll_interval: float = 0.5,
+        on_give_up: Optional[Callable[[Dict[str, Any], Exception], None]] = None,
+        defer_on: Tuple[Type[Exception], ...] = (),
+    ):
+        self.backend = backend
+        self.queue = queue
+        self.handler = handler
+        self.threads = threads
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.on_give_up = on_give_up
+        self.defer_on = defer_on
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.threads):
+            t = threading.Thread(target=self._run, name=f"{self.queue}-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def request_stop(self) -> None:
+        """Stop taking new jobs; in-flight ones keep running."""
+        self._stop.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop taking new jobs and wait (up to `timeout` in total) for in-flight ones."""
+        self.request_stop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.backend.dequeue(self.queue, self.lease_seconds)
+            except Exception as e:
+                print(f"[QUEUE] dequeue from {self.queue} failed: {e}")
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                self._process(job)
+            except Exception as e:
+                # ack/retry failed (e.g. database locked); the job is redelivered
+                # once its lease runs out, so keep the thread alive
+                print(f"[QUEUE] {self.queue} job {job.id} bookkeeping failed: {e}")
+
+    def _process(self, job: Job) -> None:
+        try:
+            self.handler(job.payload)
+        except Exception as e:
+            if isinstance(e, self.defer_on):
+                delay = getattr(e, "retry_after", None) or self.poll_interval
+                self.backend.retry(job, delay, refund=True)
+                return
+
+            if job.attempts >= self.max_attempts:
+                print(f"[QUEUE] {self.queue} job {job.id} failed {job.attempts}x, giving up: {e}")
+                self.backend.ack(job)
+                if self.on_give_up:
+                    try:
+                        self.on_give_up(job.payload, e)
+                    except Exception as give_up_error:
+                        print(f"[QUEUE] {self.queue} on_give_up failed: {give_up_error}")
+                return
+
+            delay = min(2 ** job.attempts, 300)
+            print(f"[QUEUE] {self.queue} job {job.id} failed ({e}); retry in {delay}s")
+            self.backend.retry(job, delay)
+            return
+
+        self.backend.ack(job)
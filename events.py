@@ -0,0 +1,82 @@
+# events.py
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+# Pulls the event type out of the raw body without decoding the JSON, so
+# ignored events (Download, Rename, Health, ...) never get parsed at all.
+_EVENT_TYPE_RE = re.compile(rb'"eventType"\s*:\s*"([A-Za-z]+)"')
+
+
+def sniff_event_type(body: bytes) -> Optional[str]:
+    """Cheap pre-filter; None means "couldn't tell", fall back to a full parse."""
+    match = _EVENT_TYPE_RE.search(body)
+    return match.group(1).decode("ascii") if match else None
+
+
+def format_size(size_bytes: Optional[int]) -> str:
+    gib_size = int(size_bytes or 0) / (1024 ** 3)
+    return f"{gib_size:.2f} GiB"
+
+
+class GrabEvent:
+    """
+    A parsed *Arr Grab webhook, reduced to what the rule engine, the
+    notifiers and the grab queue need.
+    """
+
+    __slots__ = ("torrent_hash", "app", "indexer", "title", "size_bytes")
+
+    def __init__(
+        self,
+        torrent_hash: str,
+        app: str,
+        indexer: str,
+        title: str,
+        size_bytes: int = 0,
+    ):
+        self.torrent_hash = torrent_hash
+        self.app = app
+        self.indexer = indexer
+        self.title = title
+        self.size_bytes = size_bytes
+
+    @property
+    def size(self) -> str:
+        return format_size(self.size_bytes)
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "GrabEvent":
+        release = payload.get("release") or {}
+        download_id = payload.get("downloadId") or ""
+        return cls(
+            # qBittorrent reports hashes in lowercase; *Arr sends them uppercase
+            torrent_hash=download_id.lower(),
+            app=payload.get("instanceName") or "",
+            indexer=release.get("indexer") or "",
+            title=release.get("releaseTitle") or release.get("title") or "",
+            size_bytes=int(release.get("size") or 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GrabEvent":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def __repr__(self) -> str:
+        return (
+            f"GrabEvent(hash={self.torrent_hash}, app={self.app}, "
+            f"indexer={self.indexer}, title={self.title!r})"
+        )
+
+
+def parse_json(body: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
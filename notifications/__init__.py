@@ -2,6 +2,7 @@
 from __future__ import annotations
 from typing import Optional
 
+from approval_tokens import ApprovalSigner
 from config import ApprovarrConfig
 from .base import Notifier
 from .pushover import PushoverNotifier
@@ -9,7 +10,9 @@ from .ntfy import NtfyNotifier
 from .discord import DiscordNotifier
 
 
-def build_notifier(cfg: ApprovarrConfig) -> Optional[Notifier]:
+def build_notifier(
+    cfg: ApprovarrConfig, signer: Optional[ApprovalSigner] = None
+) -> Optional[Notifier]:
     provider = cfg.notifications.provider.lower()
 
     base_public_url = cfg.server.get("external_url") or cfg.server.get("base_public_url")
@@ -24,6 +27,7 @@ def build_notifier(cfg: ApprovarrConfig) -> Optional[Notifier]:
             token=po["token"],
             user=po["user"],
             base_public_url=base_public_url,
+            signer=signer,
         )
 
     if provider == "ntfy":
@@ -32,6 +36,7 @@ def build_notifier(cfg: ApprovarrConfig) -> Optional[Notifier]:
             server=nt.get("server", "https://ntfy.sh"),
             topic=nt["topic"],
             base_public_url=base_public_url,
+            signer=signer,
         )
 
     if provider == "discord":
@@ -39,6 +44,7 @@ def build_notifier(cfg: ApprovarrConfig) -> Optional[Notifier]:
         return DiscordNotifier(
             webhook_url=dc["webhook_url"],
             base_public_url=base_public_url,
+            signer=signer,
         )
 
     raise ValueError(f"Unknown notification provider: {provider}")
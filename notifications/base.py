@@ -1,7 +1,21 @@
 # notifications/base.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Protocol, Optional
+from typing import Optional, Protocol, Tuple
+
+from approval_tokens import ApprovalSigner
+
+
+def action_urls(
+    base_public_url: str, torrent_hash: str, signer: Optional[ApprovalSigner] = None
+) -> Tuple[str, str]:
+    """Build the (approve, reject) links, signed when a signer is configured."""
+    approve_url = f"{base_public_url}/approve/{torrent_hash}"
+    reject_url = f"{base_public_url}/reject/{torrent_hash}"
+    if signer is not None:
+        approve_url += f"?token={signer.sign('approve', torrent_hash)}"
+        reject_url += f"?token={signer.sign('reject', torrent_hash)}"
+    return approve_url, reject_url
 
 
 class Notifier(Protocol):
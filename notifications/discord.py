@@ -3,29 +3,35 @@ from __future__ import annotations
 import requests
 from typing import Optional
 
-from .base import Notifier
+from approval_tokens import ApprovalSigner
+
+from .base import Notifier, action_urls
 
 
 class DiscordNotifier(Notifier):
-    def __init__(self, webhook_url: str, base_public_url: str):
+    def __init__(
+        self, webhook_url: str, base_public_url: str, signer: Optional[ApprovalSigner] = None
+    ):
         self.webhook_url = webhook_url
         self.base_public_url = base_public_url.rstrip("/")
+        self.signer = signer
 
     def send_approval(
         self,
         *,
         name: str,
+        size: str,
         torrent_hash: str,
         indexer: str,
         extra: Optional[dict] = None,
     ) -> None:
-        approve_url = f"{self.base_public_url}/approve/{torrent_hash}"
-        reject_url  = f"{self.base_public_url}/reject/{torrent_hash}"
+        approve_url, reject_url = action_urls(self.base_public_url, torrent_hash, self.signer)
 
         content = (
             f"**Torrent needs approval**\n"
             f"**Name:** {name}\n"
-            f"**Indexer:** {indexer}\n\n"
+            f"**Indexer:** {indexer}\n"
+            f"**Size:** {size}\n\n"
             f"[✅ Approve]({approve_url}) | [🗑️ Reject]({reject_url})"
         )
         r = requests.post(
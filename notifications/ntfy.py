@@ -3,14 +3,23 @@ from __future__ import annotations
 import requests
 from typing import Optional
 
-from .base import Notifier
+from approval_tokens import ApprovalSigner
+
+from .base import Notifier, action_urls
 
 
 class NtfyNotifier(Notifier):
-    def __init__(self, server: str, topic: str, base_public_url: str):
+    def __init__(
+        self,
+        server: str,
+        topic: str,
+        base_public_url: str,
+        signer: Optional[ApprovalSigner] = None,
+    ):
         self.server = server.rstrip("/")
         self.topic = topic
         self.base_public_url = base_public_url.rstrip("/")
+        self.signer = signer
 
     def _post(self, title: str, body: str) -> None:
         url = f"{self.server}/{self.topic}"
@@ -26,16 +35,17 @@ class NtfyNotifier(Notifier):
         self,
         *,
         name: str,
+        size: str,
         torrent_hash: str,
         indexer: str,
         extra: Optional[dict] = None,
     ) -> None:
-        approve_url = f"{self.base_public_url}/approve/{torrent_hash}"
-        reject_url  = f"{self.base_public_url}/reject/{torrent_hash}"
+        approve_url, reject_url = action_urls(self.base_public_url, torrent_hash, self.signer)
 
         body = (
             f"{name}\n"
-            f"Indexer: {indexer}\n\n"
+            f"Indexer: {indexer}\n"
+            f"Size: {size}\n\n"
             f"Approve: {approve_url}\n"
             f"Reject:  {reject_url}"
         )
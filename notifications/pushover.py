@@ -5,14 +5,23 @@ from typing import Optional
 
 import requests
 
-from .base import Notifier
+from approval_tokens import ApprovalSigner
+
+from .base import Notifier, action_urls
 
 
 class PushoverNotifier(Notifier):
-    def __init__(self, token: str, user: str, base_public_url: str):
+    def __init__(
+        self,
+        token: str,
+        user: str,
+        base_public_url: str,
+        signer: Optional[ApprovalSigner] = None,
+    ):
         self.token = token
         self.user = user
         self.base_public_url = base_public_url.rstrip("/")
+        self.signer = signer
 
     def send_approval(
         self,
@@ -23,8 +32,7 @@ class PushoverNotifier(Notifier):
         indexer: str,
         extra: Optional[dict] = None,
     ) -> None:
-        approve_url = f"{self.base_public_url}/approve/{torrent_hash}"
-        reject_url = f"{self.base_public_url}/reject/{torrent_hash}"
+        approve_url, reject_url = action_urls(self.base_public_url, torrent_hash, self.signer)
 
         msg = (
             f"Indexer: {indexer}\n"
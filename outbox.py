@@ -0,0 +1,63 @@
+# outbox.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from coordination import QueueWorker
+from resilience import CircuitOpenError
+from state_backend import StateBackend
+
+OUTBOX_QUEUE = "outbox"
+
+
+class Outbox:
+    """
+    Durable queue of side effects (approve, reject, notify, ...) that failed
+    because a dependency was down. Entries live in the state backend, so they
+    survive restarts, and are drained with exponential backoff; while a
+    circuit breaker is open, retries wait exactly until it half-opens.
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        handlers: Dict[str, Callable[..., None]],
+        max_attempts: int = 20,
+        on_give_up: Optional[Callable[[str, Dict[str, Any], Exception], None]] = None,
+    ):
+        self.backend = backend
+        self.handlers = handlers
+        self._on_give_up = on_give_up
+        self._worker = QueueWorker(
+            backend,
+            OUTBOX_QUEUE,
+            self._dispatch,
+            threads=1,
+            max_attempts=max_attempts,
+            defer_on=(CircuitOpenError,),
+            on_give_up=self._give_up,
+        )
+
+    def push(self, action: str, delay_seconds: float = 0.0, **kwargs: Any) -> None:
+        if action not in self.handlers:
+            raise ValueError(f"Unknown outbox action '{action}'")
+        print(f"[OUTBOX] queued {action} {kwargs}")
+        self.backend.enqueue(
+            OUTBOX_QUEUE, {"action": action, "args": kwargs}, delay_seconds=delay_seconds
+        )
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def request_stop(self) -> None:
+        self._worker.request_stop()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._worker.stop(timeout)
+
+    def _dispatch(self, entry: Dict[str, Any]) -> None:
+        self.handlers[entry["action"]](**entry["args"])
+
+    def _give_up(self, entry: Dict[str, Any], error: Exception) -> None:
+        if self._on_give_up:
+            self._on_give_up(entry["action"], entry["args"], error)
@@ -2,12 +2,27 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional, Union
 
 import requests
 
 from config import QbitConfig, ApprovarrConfig
 
+NEEDS_APPROVAL_TAG = "needs-approval"
+APPROVED_TAG = "approved"
+
+# torrent states where nothing is being downloaded (v4 "paused*", v5 "stopped*")
+PAUSED_STATES = {"pausedDL", "pausedUP", "stoppedDL", "stoppedUP"}
+
+Hashes = Union[str, Iterable[str]]
+
+
+def join_hashes(hashes: Hashes) -> str:
+    """qBittorrent accepts several hashes in one call, separated by '|'."""
+    if isinstance(hashes, str):
+        return hashes
+    return "|".join(hashes)
+
 
 @dataclass
 class QbitClient:
@@ -27,6 +42,8 @@ class QbitClient:
         url = f"{self.base_url}{path}"
         resp = self.session.post(url, data=data or {}, timeout=5)
         print(f"[QBT] POST {url} -> {resp.status_code} {resp.text[:200]!r}")
+        if self._session_expired(resp, path):
+            resp = self.session.post(url, data=data or {}, timeout=5)
         return resp
 
     def _get(
@@ -36,8 +53,21 @@ class QbitClient:
         url = f"{self.base_url}{path}"
         resp = self.session.get(url, params=params or {}, timeout=5)
         print(f"[QBT] GET {url} -> {resp.status_code} {resp.text[:200]!r}")
+        if self._session_expired(resp, path):
+            resp = self.session.get(url, params=params or {}, timeout=5)
         return resp
 
+    def _session_expired(self, resp: requests.Response, path: str) -> bool:
+        """
+        qBittorrent answers 403 once our cookie expires (or was revoked by a
+        restart). Log in again so the caller can retry once.
+        """
+        if resp.status_code != 403 or not self._logged_in or path == "/api/v2/auth/login":
+            return False
+        self._logged_in = False
+        self.login()
+        return True
+
     def login(self) -> None:
         """Login once; reuse session cookie."""
         if self._logged_in:
@@ -62,26 +92,26 @@ class QbitClient:
 
     # ------------- Public API methods -------------
 
-    def add_tags(self, torrent_hash: str, tags: list[str]) -> None:
+    def add_tags(self, torrent_hash: Hashes, tags: list[str]) -> None:
         self.ensure_login()
         resp = self._post(
             "/api/v2/torrents/addTags",
-            data={"hashes": torrent_hash, "tags": ",".join(tags)},
+            data={"hashes": join_hashes(torrent_hash), "tags": ",".join(tags)},
         )
         resp.raise_for_status()
 
-    def remove_tag(self, torrent_hash: str, tag: str) -> None:
+    def remove_tag(self, torrent_hash: Hashes, tag: str) -> None:
         self.ensure_login()
         resp = self._post(
             "/api/v2/torrents/removeTags",
-            data={"hashes": torrent_hash, "tags": tag},
+            data={"hashes": join_hashes(torrent_hash), "tags": tag},
         )
         resp.raise_for_status()
 
-    def pause(self, torrent_hash: str) -> None:
+    def pause(self, torrent_hash: Hashes) -> None:
         """Pause/stop torrent; supports qBittorrent v5 (stop) and v4 (pause)."""
         self.ensure_login()
-        data = {"hashes": torrent_hash}
+        data = {"hashes": join_hashes(torrent_hash)}
 
         # Try v5-style endpoint first
         resp = self._post("/api/v2/torrents/stop", data)
@@ -91,10 +121,10 @@ class QbitClient:
 
         resp.raise_for_status()
 
-    def resume(self, torrent_hash: str) -> None:
+    def resume(self, torrent_hash: Hashes) -> None:
         """Resume/start torrent; supports v5 (start) and v4 (resume)."""
         self.ensure_login()
-        data = {"hashes": torrent_hash}
+        data = {"hashes": join_hashes(torrent_hash)}
 
         resp = self._post("/api/v2/torrents/start", data)
         if resp.status_code == 404:
@@ -102,21 +132,90 @@ class QbitClient:
 
         resp.raise_for_status()
 
-    def delete(self, torrent_hash: str, delete_files: bool = True) -> None:
+    def set_download_limit(self, torrent_hash: Hashes, limit: int) -> None:
+        """Per-torrent download limit in bytes/s; 0 removes it."""
+        self.ensure_login()
+        resp = self._post(
+            "/api/v2/torrents/setDownloadLimit",
+            data={"hashes": join_hashes(torrent_hash), "limit": limit},
+        )
+        resp.raise_for_status()
+
+    def set_upload_limit(self, torrent_hash: Hashes, limit: int) -> None:
+        """Per-torrent upload limit in bytes/s; 0 removes it."""
+        self.ensure_login()
+        resp = self._post(
+            "/api/v2/torrents/setUploadLimit",
+            data={"hashes": join_hashes(torrent_hash), "limit": limit},
+        )
+        resp.raise_for_status()
+
+    def set_category(self, torrent_hash: Hashes, category: str) -> None:
+        """Move torrents to `category` ("" clears it)."""
+        self.ensure_login()
+        resp = self._post(
+            "/api/v2/torrents/setCategory",
+            data={"hashes": join_hashes(torrent_hash), "category": category},
+        )
+        resp.raise_for_status()
+
+    def release(self, torrent_hash: Hashes, category: Optional[str] = None) -> None:
+        """
+        Let held torrents download: optionally move them out of the gate
+        category, then start them. Each step is one multi-hash call.
+        """
+        if category is not None:
+            self.set_category(torrent_hash, category)
+        self.resume(torrent_hash)
+
+    def categories(self) -> Dict[str, Dict[str, Any]]:
+        self.ensure_login()
+        resp = self._get("/api/v2/torrents/categories")
+        resp.raise_for_status()
+        return resp.json()
+
+    def ensure_category(self, category: str, save_path: Optional[str] = None) -> None:
+        """Create `category` if it does not exist; keep its save path in sync with config."""
+        existing = self.categories().get(category)
+        if existing is None:
+            path = "/api/v2/torrents/createCategory"
+        elif save_path is not None and existing.get("savePath") != save_path:
+            path = "/api/v2/torrents/editCategory"
+        else:
+            return
+
+        resp = self._post(path, data={"category": category, "savePath": save_path or ""})
+        # 409: another worker created it first
+        if resp.status_code != 409:
+            resp.raise_for_status()
+
+    def delete(self, torrent_hash: Hashes, delete_files: bool = True) -> None:
         self.ensure_login()
         resp = self._post(
             "/api/v2/torrents/delete",
             data={
-                "hashes": torrent_hash,
+                "hashes": join_hashes(torrent_hash),
                 "deleteFiles": "true" if delete_files else "false",
             },
         )
         resp.raise_for_status()
 
-    def list_all(self) -> list[dict[str, Any]]:
-        """Optional helper if you ever want to search torrents by name/size/etc."""
+    def list_all(
+        self,
+        tag: Optional[str] = None,
+        category: Optional[str] = None,
+        hashes: Optional[Hashes] = None,
+    ) -> list[dict[str, Any]]:
+        """List torrents, optionally filtered server-side by tag, category and/or hashes."""
         self.ensure_login()
-        resp = self._get("/api/v2/torrents/info")
+        params: Dict[str, Any] = {}
+        if tag is not None:
+            params["tag"] = tag
+        if category is not None:
+            params["category"] = category
+        if hashes is not None:
+            params["hashes"] = join_hashes(hashes)
+        resp = self._get("/api/v2/torrents/info", params)
         resp.raise_for_status()
         return resp.json()
 
@@ -0,0 +1,298 @@
+# reconciler.py
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from approval_scheduler import ApprovalScheduler, PendingApproval
+from config import BehaviorConfig, GateConfig
+from events import format_size
+from notifications import Notifier
+from qbittorrent_client import (
+    APPROVED_TAG,
+    NEEDS_APPROVAL_TAG,
+    PAUSED_STATES,
+    QbitClient,
+)
+from throttle import apply_limits, clear_limits, hold_limits, is_throttled, limits_match
+
+
+def _tags(torrent: Dict[str, Any]) -> set[str]:
+    return {t.strip() for t in (torrent.get("tags") or "").split(",") if t.strip()}
+
+
+@dataclass
+class ReconcileReport:
+    repaused: List[str] = field(default_factory=list)
+    resumed: List[str] = field(default_factory=list)
+    retagged: List[str] = field(default_factory=list)
+    untagged: List[str] = field(default_factory=list)
+    adopted: List[str] = field(default_factory=list)
+    forgotten: List[str] = field(default_factory=list)
+    renotified: List[str] = field(default_factory=list)
+    rethrottled: List[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not any(vars(self).values())
+
+    def summary(self) -> str:
+        return ", ".join(f"{k}={len(v)}" for k, v in vars(self).items() if v) or "no drift"
+
+
+class Reconciler:
+    """
+    Periodically diffs qBittorrent against the scheduler's pending approvals
+    and repairs what a half-failed webhook/approval left behind:
+
+    - pending but running            -> re-pause
+    - throttled but limits drifted   -> re-apply limits (and re-split the budget)
+    - pending but never notified     -> re-notify
+    - pending, links about to expire -> re-notify with fresh links
+    - pending but missing the tag    -> re-tag
+    - pending but gone from qBit     -> forget
+    - pending but tagged approved    -> finish the approval (resume)
+    - tagged needs-approval, unknown -> adopt as pending (pause + notify)
+    - tagged needs-approval+approved -> clear the stale needs-approval tag
+    - stopped in the gate, untouched -> adopt as pending (its Grab webhook was lost)
+
+    The steady state costs one `list_all(tag=needs-approval)` call, plus one
+    `list_all(category=gate)` when the gate is enabled; repairs are issued as
+    multi-hash calls.
+    """
+
+    def __init__(
+        self,
+        qbt: QbitClient,
+        scheduler: ApprovalScheduler,
+        notifier: Optional[Notifier],
+        behavior: BehaviorConfig,
+        grace_seconds: float = 60.0,
+        gate: Optional[GateConfig] = None,
+        link_ttl_seconds: Optional[float] = None,
+    ):
+        self.qbt = qbt
+        self.scheduler = scheduler
+        self.notifier = notifier
+        self.behavior = behavior
+        # ignore approvals younger than this; their webhook may still be in flight
+        self.grace_seconds = grace_seconds
+        self.gate_category = gate.category if gate and gate.enabled else None
+        self.release_category = gate.release_category if gate and gate.enabled else None
+        # approvals without a deadline can outlive their signed links
+        self.link_ttl_seconds = link_ttl_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------- lifecycle -------------
+
+    def start(
+        self, interval_seconds: float, only_if: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """Run a pass every `interval_seconds`; `only_if` lets replicas elect one runner."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval_seconds, only_if), name="reconciler", daemon=True
+        )
+        self._thread.start()
+
+    def request_stop(self) -> None:
+        """Signal the thread to exit without waiting for it."""
+        self._stop.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.request_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval_seconds: float, only_if: Optional[Callable[[], bool]]) -> None:
+        while not self._stop.wait(interval_seconds):
+            if only_if is not None and not only_if():
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[RECONCILE] pass failed: {e}")
+
+    # ------------- one pass -------------
+
+    def run_once(self) -> ReconcileReport:
+        report = ReconcileReport()
+        # other replicas may have added/resolved approvals since our last sync
+        self.scheduler.sync()
+        now = time.time()
+
+        pending = {
+            p.torrent_hash.lower(): p
+            for p in self.scheduler.all()
+            if now - p.created_at >= self.grace_seconds
+        }
+
+        tagged = {t["hash"].lower(): t for t in self.qbt.list_all(tag=NEEDS_APPROVAL_TAG)}
+
+        # pending torrents that lost (or never got) the tag; only looked up when needed
+        missing = [h for h in pending if h not in tagged]
+        untagged: Dict[str, Dict[str, Any]] = {}
+        if missing:
+            untagged = {t["hash"].lower(): t for t in self.qbt.list_all(hashes=missing)}
+
+        to_pause: List[str] = []
+        to_resume: List[str] = []
+        to_tag: List[str] = []
+        to_untag: List[str] = []
+        to_notify: List[PendingApproval] = []
+        # soft holds: compare every throttled torrent's limits with its share of the budget
+        to_throttle = {
+            h: limits
+            for h, limits in hold_limits(self.scheduler.all(), self.behavior).items()
+            if h in tagged
+            and APPROVED_TAG not in _tags(tagged[h])
+            and not limits_match(tagged[h], limits)
+        }
+
+        for h, torrent in tagged.items():
+            tags = _tags(torrent)
+            p = pending.get(h)
+
+            if APPROVED_TAG in tags:
+                to_untag.append(h)
+                if p is not None:
+                    to_resume.append(h)
+                continue
+
+            if p is None:
+                if h in self.scheduler:
+                    continue  # still within grace period
+                p = self._adopt(torrent)
+                report.adopted.append(h)
+
+            if p.pause_torrent and torrent.get("state") not in PAUSED_STATES:
+                to_pause.append(h)
+            if self._needs_notify(p, now):
+                to_notify.append(p)
+
+        if self.gate_category:
+            for torrent in self.qbt.list_all(category=self.gate_category):
+                h = torrent["hash"].lower()
+                if (
+                    h in tagged
+                    or h in self.scheduler
+                    or _tags(torrent) & {NEEDS_APPROVAL_TAG, APPROVED_TAG}
+                    or torrent.get("state") not in PAUSED_STATES
+                    or torrent.get("progress", 0) > 0
+                    or now - torrent.get("added_on", now) < self.grace_seconds
+                ):
+                    continue
+                # held by the gate but never seen by us: ask rather than let it through
+                p = self._adopt(torrent)
+                report.adopted.append(h)
+                to_tag.append(h)
+                to_notify.append(p)
+
+        for h in missing:
+            p = pending[h]
+            torrent = untagged.get(h)
+            if torrent is None:
+                self.scheduler.resolve(p.torrent_hash)
+                report.forgotten.append(h)
+                continue
+
+            if APPROVED_TAG in _tags(torrent):
+                # approval got as far as tagging but the resume failed
+                to_resume.append(h)
+                continue
+
+            to_tag.append(h)
+            if p.pause_torrent and torrent.get("state") not in PAUSED_STATES:
+                to_pause.append(h)
+            if self._needs_notify(p, now):
+                to_notify.append(p)
+
+        # ---- batched repairs ----
+        if to_untag:
+            self.qbt.remove_tag(to_untag, NEEDS_APPROVAL_TAG)
+            report.untagged = to_untag
+        if to_tag:
+            self.qbt.add_tags(to_tag, [NEEDS_APPROVAL_TAG])
+            report.retagged = to_tag
+        if to_pause:
+            self.qbt.pause(to_pause)
+            report.repaused = to_pause
+        if to_throttle:
+            apply_limits(self.qbt, to_throttle)
+            report.rethrottled = list(to_throttle)
+        if to_resume:
+            throttled = [h for h in to_resume if is_throttled(pending[h])]
+            if throttled:
+                clear_limits(self.qbt, throttled)
+            self.qbt.release(to_resume, self.release_category)
+            for h in to_resume:
+                self.scheduler.resolve(pending[h].torrent_hash)
+            report.resumed = to_resume
+
+        for p in to_notify:
+            if not self.notifier:
+                break
+            try:
+                self.notifier.send_approval(
+                    name=p.name or p.torrent_hash,
+                    size=p.size,
+                    torrent_hash=p.torrent_hash,
+                    indexer=p.indexer,
+                )
+            except Exception as e:
+                print(f"[RECONCILE] re-notify failed for {p.torrent_hash}: {e}")
+                continue
+            p.mark_notified()
+            self.scheduler.update(p)
+            report.renotified.append(p.torrent_hash)
+
+        if not report.is_empty():
+            print(f"[RECONCILE] {report.summary()}")
+        return report
+
+    def _needs_notify(self, p: PendingApproval, now: float) -> bool:
+        """Never notified, or the links sent are past 90% of their lifetime."""
+        if not p.notified:
+            return True
+        if not self.link_ttl_seconds:
+            return False
+        return now - (p.notified_at or p.created_at) >= 0.9 * self.link_ttl_seconds
+
+    def _adopt(self, torrent: Dict[str, Any]) -> PendingApproval:
+        """Start tracking a tagged torrent we have no record of (e.g. state lost on a crash)."""
+        timeout = self.behavior.approval_timeout_seconds
+        p = PendingApproval(
+            torrent_hash=torrent["hash"].lower(),
+            name=torrent.get("name", ""),
+            size=format_size(torrent.get("size")),
+            indexer=torrent.get("tracker", ""),
+            app=torrent.get("category", ""),
+            deadline=time.time() + timeout if timeout else None,
+            on_timeout=self.behavior.default_on_timeout,
+            on_error=self.behavior.default_on_error,
+            pause_torrent=True,
+        )
+        self.scheduler.add(p)
+        return p
+
+
+def build_reconciler(
+    qbt: QbitClient,
+    scheduler: ApprovalScheduler,
+    notifier: Optional[Notifier],
+    behavior: BehaviorConfig,
+    gate: Optional[GateConfig] = None,
+    link_ttl_seconds: Optional[float] = None,
+) -> Reconciler:
+    return Reconciler(
+        qbt,
+        scheduler,
+        notifier,
+        behavior,
+        grace_seconds=max(60.0, behavior.creation_delay_seconds * 10),
+        gate=gate,
+        link_ttl_seconds=link_ttl_seconds,
+    )
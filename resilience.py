@@ -0,0 +1,127 @@
+# resilience.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# numeric values for the metrics endpoint
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    - closed:    calls go through; `failure_threshold` consecutive failures open it
+    - open:      calls fail immediately with CircuitOpenError for `reset_timeout` seconds
+    - half_open: one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == CLOSED:
+                return
+
+            if self._state == OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+
+            # half-open: a single caller probes the dependency
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.name, 1.0)
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"[BREAKER] {self.name} closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"[BREAKER] {self.name} open after {self._failures} failure(s)")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class BreakerProxy:
+    """
+    Wraps a client so every public method call goes through `breaker`.
+
+    Methods named in `passthrough` bypass it: calls that usually don't touch
+    the network (e.g. a cached login) would otherwise count as successes and
+    keep resetting the failure count.
+    """
+
+    def __init__(self, target: Any, breaker: CircuitBreaker, passthrough: Iterable[str] = ()):
+        self._target = target
+        self._breaker = breaker
+        self._passthrough = frozenset(passthrough)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith("_") or name in self._passthrough or not callable(attr):
+            return attr
+
+        def guarded(*args: Any, **kwargs: Any) -> Any:
+            return self._breaker.call(attr, *args, **kwargs)
+
+        return guarded
+
+    def __repr__(self) -> str:
+        return f"BreakerProxy({self._target!r}, {self._breaker.name})"
+
+
+def guarded(
+    target: Optional[Any], breaker: CircuitBreaker, passthrough: Iterable[str] = ()
+) -> Optional[Any]:
+    return BreakerProxy(target, breaker, passthrough) if target is not None else None
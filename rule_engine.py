@@ -0,0 +1,104 @@
+# rule_engine.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from config import BehaviorConfig, RuleConfig
+
+
+@dataclass
+class RuleDecision:
+    needs_approval: bool = False
+    needs_pause: bool = False
+    tags: List[str] = field(default_factory=list)
+    matched_rules: List[str] = field(default_factory=list)
+    on_error: str = "allow"
+    approval_timeout_seconds: Optional[float] = None
+    on_timeout: str = "deny"
+    hold: Optional[str] = None  # pause | throttle | None
+    hold_download_limit: int = 0  # bytes/s, 0 = unlimited
+    hold_upload_limit: int = 0
+
+
+def _limit(rule_value: Optional[int], default: int) -> int:
+    return default if rule_value is None else rule_value
+
+
+def _strictest(limits: List[int]) -> int:
+    """Lowest limit, where 0 means unlimited."""
+    limited = [limit for limit in limits if limit > 0]
+    return min(limited) if limited else 0
+
+
+def evaluate_rules(
+    rules: List[RuleConfig],
+    behavior: BehaviorConfig,
+    app_name: str,
+    indexer: str,
+) -> RuleDecision:
+    """
+    Run a grabbed release through every rule and merge the matches.
+
+    - on_error: first matching rule that sets it, else behavior.default_on_error
+    - timeout:  shortest timeout among matching rules, else the behavior default
+    - on_timeout: "deny" wins if any matching rule (or the default) denies
+    - hold: "pause" wins over "throttle"; throttled torrents get the lowest limits
+    """
+    decision = RuleDecision(
+        on_error=behavior.default_on_error,
+        approval_timeout_seconds=behavior.approval_timeout_seconds,
+        on_timeout=behavior.default_on_timeout,
+    )
+
+    app_lower = (app_name or "").lower()
+    on_error: Optional[str] = None
+    timeouts: List[float] = []
+    on_timeouts: List[str] = []
+    throttle = False
+    download_limits: List[int] = []
+    upload_limits: List[int] = []
+
+    for rule in rules:
+        if not (
+            rule.notify
+            and app_lower in [a.lower() for a in rule.apps]
+            and indexer
+            in rule.indexer_matches  # TODO: use matcher fn here for either direct match or regex
+        ):
+            continue
+
+        # these only apply if the rules matches!
+        decision.needs_approval = True
+        decision.matched_rules.append(rule.name)
+        hold = rule.hold or ("pause" if rule.pause_torrent else "none")
+        if hold == "pause":  # as soon as one rule wants pause, we do it.
+            decision.needs_pause = True
+        elif hold == "throttle":
+            throttle = True
+            download_limits.append(_limit(rule.hold_download_limit, behavior.hold_download_limit))
+            upload_limits.append(_limit(rule.hold_upload_limit, behavior.hold_upload_limit))
+        for tag in rule.tags_to_add:
+            if tag not in decision.tags:
+                decision.tags.append(tag)
+
+        if on_error is None and rule.on_error:
+            on_error = rule.on_error
+        if rule.approval_timeout_seconds is not None:
+            timeouts.append(rule.approval_timeout_seconds)
+        on_timeouts.append(rule.on_timeout or behavior.default_on_timeout)
+
+    if on_error:
+        decision.on_error = on_error
+    if timeouts:
+        decision.approval_timeout_seconds = min(timeouts)
+    if on_timeouts:
+        decision.on_timeout = "deny" if "deny" in on_timeouts else "allow"
+    if decision.needs_pause:
+        decision.hold = "pause"
+    elif throttle:
+        decision.hold = "throttle"
+        decision.hold_download_limit = _strictest(download_limits)
+        decision.hold_upload_limit = _strictest(upload_limits)
+
+    return decision
@@ -0,0 +1,82 @@
+# serve.py
+"""
+Production entry point: gunicorn with a preloaded application factory.
+
+    python serve.py                      # reads ./config.yml (or $APPROVARR_CONFIG)
+
+Tuning comes from the `server` section of the config:
+
+    server:
+      host: 0.0.0.0
+      port: 5001
+      workers: 2              # processes
+      threads: 8              # threads per process (gthread worker)
+      keepalive: 5            # seconds to hold idle keep-alive connections
+      backlog: 2048           # listen() queue
+      timeout: 30             # kill workers stuck this long
+      graceful_timeout: 30    # time to drain in-flight approval work on shutdown
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from flask import Flask
+from gunicorn.app.base import BaseApplication
+
+from app import create_app
+
+
+def server_options(server: Dict[str, Any]) -> Dict[str, Any]:
+    host = server.get("host", "0.0.0.0")
+    port = server.get("port", 5001)
+    return {
+        "bind": f"{host}:{port}",
+        "workers": server.get("workers", 2),
+        "worker_class": "gthread",
+        "threads": server.get("threads", 8),
+        "keepalive": server.get("keepalive", 5),
+        "backlog": server.get("backlog", 2048),
+        "timeout": server.get("timeout", 30),
+        "graceful_timeout": server.get("graceful_timeout", 30),
+        "preload_app": True,
+        "accesslog": server.get("accesslog"),
+    }
+
+
+class ApprovarrServer(BaseApplication):
+    def __init__(self, application: Flask, options: Dict[str, Any]):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+        service = self.application.extensions["approvarr"]
+        drain_timeout = max(self.options["graceful_timeout"] - 5, 1)
+
+        # background threads don't survive fork(); start them in every worker
+        def post_fork(server, worker):
+            service.start()
+
+        # SIGTERM/SIGQUIT: gunicorn finishes in-flight requests, then we drain grab jobs
+        def worker_exit(server, worker):
+            service.stop(timeout=drain_timeout)
+
+        self.cfg.set("post_fork", post_fork)
+        self.cfg.set("worker_exit", worker_exit)
+
+    def load(self) -> Flask:
+        return self.application
+
+
+def main(config_path: Optional[str] = None) -> None:
+    application = create_app(config_path, start_services=False)
+    options = server_options(application.extensions["approvarr"].cfg.server)
+    ApprovarrServer(application, options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# state_backend.py
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from config import ApprovarrConfig, StateConfig
+
+
+@dataclass
+class Job:
+    id: str
+    queue: str
+    payload: Dict[str, Any]
+    attempts: int
+    enqueued_at: float
+
+
+class StateBackend(Protocol):
+    """
+    Shared state for one or more app processes/replicas:
+    pending approvals, a de-duplication set, a job queue and named leases.
+
+    Queue semantics: dequeue() hides a job for `lease_seconds`; if the worker
+    dies before ack()/retry(), the job becomes visible again.
+    """
+
+    # ---- pending approvals ----
+    def put_pending(self, torrent_hash: str, deadline: Optional[float], data: Dict[str, Any]) -> None:
+        ...
+
+    def get_pending(self, torrent_hash: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def delete_pending(self, torrent_hash: str) -> bool:
+        """Remove an entry; True only for the caller that actually removed it."""
+        ...
+
+    def load_pending(self) -> List[Dict[str, Any]]:
+        ...
+
+    # ---- de-duplication ----
+    def claim_once(self, key: str, ttl_seconds: float) -> bool:
+        """True the first time `key` is seen within `ttl_seconds`."""
+        ...
+
+    def release_claim(self, key: str) -> None:
+        """Forget a claim, so the next claim_once(key) succeeds again."""
+        ...
+
+    # ---- job queue ----
+    def enqueue(self, queue: str, payload: Dict[str, Any], delay_seconds: float = 0.0) -> None:
+        ...
+
+    def dequeue(self, queue: str, lease_seconds: float) -> Optional[Job]:
+        ...
+
+    def ack(self, job: Job) -> None:
+        ...
+
+    def retry(self, job: Job, delay_seconds: float, refund: bool = False) -> None:
+        """Make the job visible again later; `refund` un-counts this attempt."""
+        ...
+
+    def queue_stats(self, queue: str) -> Tuple[int, Optional[float]]:
+        """(depth, enqueued_at of the oldest job)"""
+        ...
+
+    # ---- leader election ----
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Acquire or renew `name` for `owner`; False if someone else holds it."""
+        ...
+
+    def release_lease(self, name: str, owner: str) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class SqliteBackend:
+    """
+    SQLite in WAL mode. Safe for several worker processes (or containers
+    sharing a local volume) on one host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pending_approvals (
+                torrent_hash TEXT PRIMARY KEY,
+                deadline REAL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dedupe (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_queue_available ON jobs (queue, available_at);
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    def _write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # ---- pending approvals ----
+
+    def put_pending(self, torrent_hash: str, deadline: Optional[float], data: Dict[str, Any]) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO pending_approvals (torrent_hash, deadline, data) VALUES (?, ?, ?)",
+            (torrent_hash, deadline, json.dumps(data)),
+        )
+
+    def get_pending(self, torrent_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM pending_approvals WHERE torrent_hash = ?", (torrent_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_pending(self, torrent_hash: str) -> bool:
+        cur = self._write("DELETE FROM pending_approvals WHERE torrent_hash = ?", (torrent_hash,))
+        return cur.rowcount > 0
+
+    def load_pending(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM pending_approvals").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # ---- de-duplication ----
+
+    def claim_once(self, key: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM dedupe WHERE key = ? AND expires_at < ?", (key, now))
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO dedupe (key, expires_at) VALUES (?, ?)",
+                    (key, now + ttl_seconds),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cur.rowcount > 0
+
+    def release_claim(self, key: str) -> None:
+        self._write("DELETE FROM dedupe WHERE key = ?", (key,))
+
+    # ---- job queue ----
+
+    def enqueue(self, queue: str, payload: Dict[str, Any], delay_seconds: float = 0.0) -> None:
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (queue, payload, enqueued_at, available_at) VALUES (?, ?, ?, ?)",
+            (queue, json.dumps(payload), now, now + delay_seconds),
+        )
+
+    def dequeue(self, queue: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts, enqueued_at FROM jobs"
+                    " WHERE queue = ? AND available_at <= ? ORDER BY available_at LIMIT 1",
+                    (queue, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET available_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now + lease_seconds, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return Job(
+            id=str(row[0]),
+            queue=queue,
+            payload=json.loads(row[1]),
+            attempts=row[2] + 1,
+            enqueued_at=row[3],
+        )
+
+    def ack(self, job: Job) -> None:
+        self._write("DELETE FROM jobs WHERE id = ?", (int(job.id),))
+
+    def retry(self, job: Job, delay_seconds: float, refund: bool = False) -> None:
+        self._write(
+            "UPDATE jobs SET available_at = ?, attempts = attempts - ? WHERE id = ?",
+            (time.time() + delay_seconds, 1 if refund else 0, int(job.id)),
+        )
+
+    def queue_stats(self, queue: str) -> Tuple[int, Optional[float]]:
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM jobs WHERE queue = ?", (queue,)
+            ).fetchone()
+        return depth, oldest
+
+    # ---- leader election ----
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        cur = self._write(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl_seconds, now),
+        )
+        return cur.rowcount > 0
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._write("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# atomically take the first visible job and hide it for the lease period
+_REDIS_DEQUEUE = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #ids == 0 then return nil end
+local id = ids[1]
+redis.call('ZADD', KEYS[1], ARGV[2], id)
+local raw = redis.call('HGET', KEYS[2], id)
+if not raw then
+    redis.call('ZREM', KEYS[1], id)
+    return nil
+end
+local job = cjson.decode(raw)
+job['attempts'] = (job['attempts'] or 0) + 1
+raw = cjson.encode(job)
+redis.call('HSET', KEYS[2], id, raw)
+return {id, raw}
+"""
+
+_REDIS_RENEW = """
+local cur = redis.call('GET', KEYS[1])
+if cur == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not cur then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_REDIS_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """
+    Any Redis-protocol server (Redis, Valkey, KeyDB, ...). Use this when
+    replicas run on different hosts. Needs the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "approvarr"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "state.backend 'redis' requires the 'redis' package (pip install redis)"
+            ) from e
+
+        self._r = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._dequeue = self._r.register_script(_REDIS_DEQUEUE)
+        self._renew = self._r.register_script(_REDIS_RENEW)
+        self._release = self._r.register_script(_REDIS_RELEASE)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self._prefix,) + parts)
+
+    # ---- pending approvals ----
+
+    def put_pending(self, torrent_hash: str, deadline: Optional[float], data: Dict[str, Any]) -> None:
+        self._r.hset(self._key("pending"), torrent_hash, json.dumps(data))
+
+    def get_pending(self, torrent_hash: str) -> Optional[Dict[str, Any]]:
+        raw = self._r.hget(self._key("pending"), torrent_hash)
+        return json.loads(raw) if raw else None
+
+    def delete_pending(self, torrent_hash: str) -> bool:
+        return self._r.hdel(self._key("pending"), torrent_hash) > 0
+
+    def load_pending(self) -> List[Dict[str, Any]]:
+        return [json.loads(v) for v in self._r.hvals(self._key("pending"))]
+
+    # ---- de-duplication ----
+
+    def claim_once(self, key: str, ttl_seconds: float) -> bool:
+        return bool(
+            self._r.set(self._key("dedupe", key), "1", nx=True, px=int(ttl_seconds * 1000))
+        )
+
+    def release_claim(self, key: str) -> None:
+        self._r.delete(self._key("dedupe", key))
+
+    # ---- job queue ----
+
+    def enqueue(self, queue: str, payload: Dict[str, Any], delay_seconds: float = 0.0) -> None:
+        now = time.time()
+        job_id = str(self._r.incr(self._key("jobs", "seq")))
+        job = {"payload": payload, "attempts": 0, "enqueued_at": now}
+        pipe = self._r.pipeline()
+        pipe.hset(self._key("jobs", queue), job_id, json.dumps(job))
+        pipe.zadd(self._key("queue", queue), {job_id: now + delay_seconds})
+        pipe.zadd(self._key("enqueued", queue), {job_id: now})
+        pipe.execute()
+
+    def dequeue(self, queue: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        res = self._dequeue(
+            keys=[self._key("queue", queue), self._key("jobs", queue)],
+            args=[now, now + lease_seconds],
+        )
+        if not res:
+            return None
+        job_id, raw = res
+        job = json.loads(raw)
+        return Job(
+            id=job_id,
+            queue=queue,
+            payload=job["payload"],
+            attempts=job["attempts"],
+            enqueued_at=job["enqueued_at"],
+        )
+
+    def ack(self, job: Job) -> None:
+        pipe = self._r.pipeline()
+        pipe.zrem(self._key("queue", job.queue), job.id)
+        pipe.zrem(self._key("enqueued", job.queue), job.id)
+        pipe.hdel(self._key("jobs", job.queue), job.id)
+        pipe.execute()
+
+    def retry(self, job: Job, delay_seconds: float, refund: bool = False) -> None:
+        if refund:
+            # the job is leased to us, so nobody else is writing it
+            key = self._key("jobs", job.queue)
+            raw = self._r.hget(key, job.id)
+            if raw:
+                data = json.loads(raw)
+                data["attempts"] = max(data.get("attempts", 1) - 1, 0)
+                self._r.hset(key, job.id, json.dumps(data))
+        self._r.zadd(self._key("queue", job.queue), {job.id: time.time() + delay_seconds})
+
+    def queue_stats(self, queue: str) -> Tuple[int, Optional[float]]:
+        depth = self._r.zcard(self._key("enqueued", queue))
+        oldest = self._r.zrange(self._key("enqueued", queue), 0, 0, withscores=True)
+        return depth, (oldest[0][1] if oldest else None)
+
+    # ---- leader election ----
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        return bool(
+            self._renew(keys=[self._key("lease", name)], args=[owner, int(ttl_seconds * 1000)])
+        )
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._release(keys=[self._key("lease", name)], args=[owner])
+
+    def close(self) -> None:
+        self._r.close()
+
+
+def build_state_backend(cfg: ApprovarrConfig) -> StateBackend:
+    state: StateConfig = cfg.state
+    if state.backend == "redis":
+        return RedisBackend(state.redis_url, prefix=state.key_prefix)
+    return SqliteBackend(state.path)
@@ -0,0 +1,17 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# the app is a set of top-level modules, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_backend import SqliteBackend  # noqa: E402
+
+
+@pytest.fixture
+def backend(tmp_path):
+    b = SqliteBackend(str(tmp_path / "state.db"))
+    yield b
+    b.close()
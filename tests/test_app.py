@@ -0,0 +1,87 @@
+# tests/test_app.py
+import json
+
+import pytest
+from flask import Flask
+
+import app as app_module
+
+
+class FakeService:
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.grabs = []
+
+    def enqueue_grab(self, event):
+        self.grabs.append(event)
+        return self.accept
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "LOGFILE", str(tmp_path / "webhooks.log"))
+    return FakeService()
+
+
+@pytest.fixture
+def client(service):
+    application = Flask(__name__)
+    application.extensions["approvarr"] = service
+    application.register_blueprint(app_module.bp)
+    return application.test_client()
+
+
+def grab(**overrides):
+    payload = {
+        "eventType": "Grab",
+        "instanceName": "Sonarr",
+        "downloadId": "ABC",
+        "release": {"indexer": "idx", "releaseTitle": "t", "size": 1},
+    }
+    payload.update(overrides)
+    return json.dumps(payload)
+
+
+def test_grab_is_enqueued(client, service):
+    resp = client.post("/webhook", data=grab())
+    assert resp.status_code == 200 and resp.text == "OK"
+    assert [e.torrent_hash for e in service.grabs] == ["abc"]
+    assert "handle;dur=" in resp.headers["Server-Timing"]
+
+
+def test_duplicate_grab(client, service):
+    service.accept = False
+    resp = client.post("/webhook", data=grab())
+    assert resp.status_code == 200 and resp.text == "OK (duplicate)"
+
+
+def test_grab_without_indexer_or_hash(client, service):
+    assert client.post("/webhook", data=grab(release={})).status_code == 400
+    resp = client.post("/webhook", data=grab(downloadId=None))
+    assert resp.status_code == 200 and resp.text == "OK (no downloadId)"
+    assert service.grabs == []
+
+
+def test_ignored_events_are_not_parsed(client, service, monkeypatch):
+    def fail(body):
+        raise AssertionError("ignored events must not be parsed")
+
+    monkeypatch.setattr(app_module, "parse_json", fail)
+    # not valid JSON past the event type: only the sniffer ever sees it
+    resp = client.post("/webhook", data=b'{"eventType": "Download", ')
+    assert resp.status_code == 200 and resp.text == "Ignored (Download)"
+    assert resp.headers["Server-Timing"].startswith("parse;dur=")
+
+
+def test_falls_back_to_full_parse(client, service):
+    # escaped key defeats the sniffer; the parsed payload still dispatches
+    resp = client.post("/webhook", data=b'{"event\\u0054ype": "Test", "instanceName": "x"}')
+    assert resp.status_code == 200 and resp.text == "OK (test)"
+
+    resp = client.post("/webhook", data=b'{"event\\u0054ype": "Rename"}')
+    assert resp.text == "Ignored (Rename)"
+
+
+def test_rejects_non_json(client):
+    assert client.post("/webhook", data=b"nope").status_code == 400
+    assert client.post("/webhook", data=b"[1]").status_code == 400
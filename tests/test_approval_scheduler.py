@@ -0,0 +1,152 @@
+# tests/test_approval_scheduler.py
+import threading
+import time
+
+import pytest
+
+from approval_scheduler import ApprovalScheduler, PendingApproval
+from state_backend import SqliteBackend
+
+
+class Recorder:
+    def __init__(self, fail_times=0):
+        self.fired = []
+        self.fail_times = fail_times
+        self.event = threading.Event()
+
+    def __call__(self, pending):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("qBittorrent down")
+        self.fired.append(pending.torrent_hash)
+        self.event.set()
+
+
+@pytest.fixture
+def make_scheduler(backend):
+    started = []
+
+    def make(on_expire, b=backend, **kwargs):
+        s = ApprovalScheduler(b, on_expire, **kwargs)
+        s.start()
+        started.append(s)
+        return s
+
+    yield make
+    for s in started:
+        s.stop(timeout=2)
+
+
+def test_fires_after_deadline_and_forgets(backend, make_scheduler):
+    rec = Recorder()
+    s = make_scheduler(rec)
+    s.add(PendingApproval("abc", deadline=time.time() + 0.05))
+    s.add(PendingApproval("nodeadline"))
+
+    assert rec.event.wait(2)
+    assert rec.fired == ["abc"]
+    assert "abc" not in s
+    assert backend.get_pending("abc") is None
+    assert "nodeadline" in s
+
+
+def test_resolve_cancels_timeout(backend, make_scheduler):
+    rec = Recorder()
+    s = make_scheduler(rec)
+    s.add(PendingApproval("abc", deadline=time.time() + 0.1))
+
+    assert s.resolve("abc") is True
+    assert s.resolve("abc") is False
+    time.sleep(0.3)
+    assert rec.fired == []
+
+
+def test_update_reschedules(make_scheduler):
+    rec = Recorder()
+    s = make_scheduler(rec)
+    p = PendingApproval("abc", deadline=time.time() + 0.05)
+    s.add(p)
+    p.deadline = time.time() + 60
+    s.update(p)
+
+    time.sleep(0.3)
+    assert rec.fired == []
+    assert s.get("abc").deadline == p.deadline
+
+
+def test_failed_action_is_retried(make_scheduler):
+    rec = Recorder(fail_times=1)
+    s = make_scheduler(rec, retry_delay_seconds=0.05)
+    s.add(PendingApproval("abc", deadline=time.time() + 0.01))
+
+    assert rec.event.wait(2)
+    assert rec.fired == ["abc"]
+
+
+def test_survives_backend_errors_when_claiming(backend, make_scheduler):
+    class FlakyDelete:
+        def __init__(self, inner):
+            self.inner = inner
+            self.fail = 1
+
+        def delete_pending(self, torrent_hash):
+            if self.fail:
+                self.fail -= 1
+                raise RuntimeError("database is locked")
+            return self.inner.delete_pending(torrent_hash)
+
+        def __getattr__(self, name):
+            return getattr(self.inner, name)
+
+    rec = Recorder()
+    s = make_scheduler(rec, b=FlakyDelete(backend), retry_delay_seconds=0.05)
+    s.add(PendingApproval("abc", deadline=time.time() + 0.01))
+
+    # the first claim fails; the entry is retried instead of killing the timer thread
+    assert rec.event.wait(2)
+    assert rec.fired == ["abc"]
+    assert s._thread.is_alive()
+
+
+def test_restart_restores_and_fires_overdue(tmp_path, make_scheduler):
+    path = str(tmp_path / "restart.db")
+    first = SqliteBackend(path)
+    before = ApprovalScheduler(first, Recorder())
+    before.add(PendingApproval("overdue", deadline=time.time() + 0.05, name="x", notified=True))
+    before.add(PendingApproval("later", deadline=time.time() + 60))
+    first.close()  # "crash" before the deadline
+
+    time.sleep(0.1)
+    rec = Recorder()
+    second = SqliteBackend(path)
+    try:
+        s = make_scheduler(rec, b=second)
+        assert rec.event.wait(2)
+        assert rec.fired == ["overdue"]
+        assert [p.torrent_hash for p in s.all()] == ["later"]
+    finally:
+        s.stop(timeout=2)
+        second.close()
+
+
+def test_fetch_sees_other_replicas(backend, make_scheduler):
+    other_backend = SqliteBackend(backend.path)
+    try:
+        mine = make_scheduler(Recorder())
+        other = ApprovalScheduler(other_backend, Recorder())
+
+        other.add(PendingApproval("abc", name="from other replica"))
+        assert mine.get("abc") is None
+        assert mine.fetch("abc").name == "from other replica"
+
+        other.resolve("abc")
+        assert mine.fetch("abc") is None
+        assert "abc" not in mine
+    finally:
+        other_backend.close()
+
+
+def test_from_dict_ignores_unknown_keys():
+    p = PendingApproval.from_dict({"torrent_hash": "abc", "from_the_future": 1})
+    assert p.torrent_hash == "abc"
+    assert PendingApproval.from_dict(p.to_dict()) == p
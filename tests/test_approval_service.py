@@ -0,0 +1,143 @@
+# tests/test_approval_service.py
+import time
+
+import pytest
+
+from approval_service import ApprovalService
+from config import (
+    ApprovarrConfig,
+    BehaviorConfig,
+    GateConfig,
+    NotificationConfig,
+    QbitConfig,
+    StateConfig,
+)
+
+
+def make_config(tmp_path, gate=None, **behavior):
+    return ApprovarrConfig(
+        qbit=QbitConfig("http://qbt", "u", "p"),
+        server={"approval_secret": "s3cret"},
+        notifications=NotificationConfig(provider="ntfy"),
+        behavior=BehaviorConfig(**behavior),
+        rules=[],
+        arr=[],
+        state=StateConfig(path=str(tmp_path / "state.db")),
+        gate=gate or GateConfig(),
+    )
+
+
+@pytest.fixture
+def service(tmp_path):
+    svc = ApprovalService(make_config(tmp_path))
+    yield svc
+    svc.stop(timeout=2)
+
+
+class SlowToStop:
+    """Wraps a component whose in-flight work takes `drain` seconds to finish."""
+
+    def __init__(self, inner, name, log, drain):
+        self.inner = inner
+        self.name = name
+        self.log = log
+        self.drain = drain
+
+    def request_stop(self):
+        self.log.append(("signal", self.name))
+        self.inner.request_stop()
+
+    def stop(self, timeout=None):
+        self.log.append(("join", self.name, timeout))
+        time.sleep(min(self.drain, timeout))
+        self.inner.stop(timeout)
+
+
+def test_stop_shares_one_deadline(service):
+    service.start()
+    log = []
+    for attr in ("grab_worker", "outbox", "reconciler", "scheduler", "leader"):
+        setattr(service, attr, SlowToStop(getattr(service, attr), attr, log, drain=0.3))
+
+    started = time.monotonic()
+    service.stop(timeout=0.5)
+    elapsed = time.monotonic() - started
+
+    # one budget for the whole shutdown, not 0.5 s per component
+    assert elapsed < 1.0
+    # every component is told to stop before anything is waited on
+    assert [e[0] for e in log] == ["signal"] * 5 + ["join"] * 5
+    budgets = [e[2] for e in log if e[0] == "join"]
+    assert budgets == sorted(budgets, reverse=True) and budgets[-1] == 0.0
+    assert service.backend is None
+
+
+def test_metrics(service):
+    assert service.render_metrics() == (
+        'approvarr_circuit_state{dependency="qbittorrent"} 0\n'
+        'approvarr_circuit_state{dependency="notifier:ntfy"} 0\n'
+    )
+
+    service.start()
+    service.backend.enqueue("grab", {"n": 1}, delay_seconds=60)
+    for _ in range(service.breakers["qbittorrent"].failure_threshold):
+        service.breakers["qbittorrent"].record_failure()
+
+    metrics = service.render_metrics().splitlines()
+    assert 'approvarr_queue_depth{queue="grab"} 1' in metrics
+    assert 'approvarr_queue_depth{queue="outbox"} 0' in metrics
+    assert "approvarr_pending_approvals 0" in metrics
+    assert 'approvarr_circuit_state{dependency="qbittorrent"} 2' in metrics
+
+
+class GatedQbit:
+    def __init__(self, *torrents):
+        self.torrents = {t["hash"]: t for t in torrents}
+        self.released = []
+
+    def list_all(self, tag=None, category=None, hashes=None):
+        return [t for h, t in self.torrents.items() if hashes is None or h in hashes]
+
+    def release(self, hashes, category=None):
+        self.released.append((hashes, category))
+
+
+def test_release_gated(tmp_path):
+    gate = GateConfig(enabled=True, category="gate", release_category="tv")
+    svc = ApprovalService(make_config(tmp_path, gate=gate))
+    svc.qbt = GatedQbit(
+        {"hash": "held", "category": "gate"}, {"hash": "moved", "category": "manual"}
+    )
+
+    svc._release_gated("held", svc.release_category)
+    # a torrent someone already moved out of the gate is left alone
+    svc._release_gated("moved", svc.release_category)
+    assert svc.qbt.released == [("held", "tv")]
+
+    # not in qBittorrent yet: fail so the grab job is retried
+    with pytest.raises(RuntimeError, match="not in qBittorrent"):
+        svc._release_gated("missing", svc.release_category)
+
+
+class RecordingQbit:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, *args))
+
+
+def test_approve_lifts_limits_without_a_lookup(tmp_path):
+    gate = GateConfig(enabled=True, category="gate", release_category="tv")
+    svc = ApprovalService(make_config(tmp_path, gate=gate))
+    svc.qbt = RecordingQbit()
+
+    # not started: there is no scheduler or backend to consult
+    svc.approve_torrent("abc")
+    assert svc.qbt.calls == [
+        ("remove_tag", "abc", "needs-approval"),
+        ("add_tags", "abc", ["approved"]),
+        ("set_download_limit", "abc", 0),
+        ("set_upload_limit", "abc", 0),
+        ("release", "abc", "tv"),
+    ]
@@ -0,0 +1,69 @@
+# tests/test_approval_tokens.py
+import time
+
+import pytest
+
+from approval_tokens import ApprovalSigner, is_unfurler
+from config import ApprovarrConfig, BehaviorConfig, NotificationConfig, QbitConfig, validate_config
+
+signer = ApprovalSigner(b"secret", ttl_seconds=60)
+
+
+def test_sign_verify_roundtrip():
+    token = signer.sign("approve", "ABCDEF")
+    assert signer.verify("approve", "abcdef", token)  # hashes are case-insensitive
+
+
+def test_token_is_bound_to_action_hash_and_secret():
+    token = signer.sign("approve", "abc")
+    assert not signer.verify("reject", "abc", token)
+    assert not signer.verify("approve", "abd", token)
+    assert not ApprovalSigner(b"other").verify("approve", "abc", token)
+
+
+def test_expired_and_tampered_tokens_fail():
+    expired = signer.sign("approve", "abc", expires=int(time.time()) - 1)
+    assert not signer.verify("approve", "abc", expired)
+
+    expires, _, mac = signer.sign("approve", "abc").partition(".")
+    # pushing the expiry out invalidates the MAC
+    assert not signer.verify("approve", "abc", f"{int(expires) + 3600}.{mac}")
+
+
+MALFORMED = [
+    None,
+    "",
+    "nodot",
+    "notanumber.mac",
+    "99999999999.",
+    "99999999999.é",  # non-ASCII MAC used to raise TypeError (500)
+    "99999999999.\x00",
+]
+
+
+@pytest.mark.parametrize("token", MALFORMED)
+def test_malformed_tokens_fail_without_raising(token):
+    assert signer.verify("approve", "abc", token) is False
+
+
+def test_unfurlers():
+    assert is_unfurler("Mozilla/5.0 (compatible; Discordbot/2.0)")
+    assert not is_unfurler("Mozilla/5.0 (X11; Linux x86_64) Firefox/130.0")
+    assert not is_unfurler(None)
+
+
+def test_validate_config_requires_secret(monkeypatch):
+    monkeypatch.delenv("APPROVARR_APPROVAL_SECRET", raising=False)
+    cfg = ApprovarrConfig(
+        qbit=QbitConfig("http://qbt", "u", "p"),
+        server={},
+        notifications=NotificationConfig(provider="ntfy"),
+        behavior=BehaviorConfig(),
+        rules=[],
+        arr=[],
+    )
+    with pytest.raises(ValueError, match="approval_secret"):
+        validate_config(cfg)
+
+    monkeypatch.setenv("APPROVARR_APPROVAL_SECRET", "s3cret")
+    assert validate_config(cfg)
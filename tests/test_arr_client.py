@@ -0,0 +1,74 @@
+# tests/test_arr_client.py
+import copy
+
+from arr_client import INITIAL_STATE_STOPPED, ArrClient
+from config import ArrInstance
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = ""
+
+    def json(self):
+        return copy.deepcopy(self.body)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"{self.status_code}")
+
+
+class FakeSession:
+    def __init__(self, clients):
+        self.clients = clients
+        self.puts = []
+
+    def get(self, url, headers=None, timeout=None):
+        return FakeResponse(body=self.clients)
+
+    def put(self, url, headers=None, json=None, timeout=None):
+        self.puts.append((url, json))
+        return FakeResponse()
+
+
+def download_client(id, host="qbt", port=8080, category="tv", state=0, impl="QBittorrent"):
+    return {
+        "id": id,
+        "name": f"client{id}",
+        "implementation": impl,
+        "fields": [
+            {"name": "host", "value": host},
+            {"name": "port", "value": port},
+            {"name": "tvCategory", "value": category},
+            {"name": "initialState", "value": state},
+        ],
+    }
+
+
+def test_configure_gate_updates_only_matching_clients():
+    session = FakeSession(
+        [
+            download_client(1),  # ours, not set up yet
+            download_client(2, category="gate", state=INITIAL_STATE_STOPPED),  # already done
+            download_client(3, host="other-qbt"),
+            download_client(4, impl="Transmission"),
+        ]
+    )
+    arr = ArrClient([ArrInstance("sonarr", "sonarr", "http://sonarr:8989/", "key")], session)
+
+    arr.configure_gate("http://qbt:8080", "gate")
+
+    assert [url for url, _ in session.puts] == ["http://sonarr:8989/api/v3/downloadclient/1"]
+    fields = {f["name"]: f["value"] for f in session.puts[0][1]["fields"]}
+    assert fields["tvCategory"] == "gate"
+    assert fields["initialState"] == INITIAL_STATE_STOPPED
+    assert fields["host"] == "qbt"  # everything else is sent back unchanged
+
+
+def test_configure_gate_matches_default_ports():
+    session = FakeSession([download_client(1, port=443)])
+    arr = ArrClient([ArrInstance("sonarr", "sonarr", "http://sonarr", "key")], session)
+
+    arr.configure_gate("https://qbt/", "gate")
+    assert len(session.puts) == 1
@@ -0,0 +1,144 @@
+# tests/test_coordination.py
+import threading
+import time
+
+from coordination import LeaderElector, QueueWorker
+
+
+class Flaky:
+    """Wraps a backend and makes the named methods raise the next `times` calls."""
+
+    def __init__(self, backend, **failures):
+        self._backend = backend
+        self.failures = failures
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+
+        def call(*args, **kwargs):
+            if self.failures.get(name):
+                self.failures[name] -= 1
+                raise RuntimeError("database is locked")
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def run_worker(backend, handler, **kwargs):
+    kwargs.setdefault("poll_interval", 0.01)
+    worker = QueueWorker(backend, "q", handler, **kwargs)
+    worker.start()
+    return worker
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_processes_and_acks(backend):
+    seen = []
+    worker = run_worker(backend, lambda payload: seen.append(payload["n"]))
+    try:
+        for n in range(3):
+            backend.enqueue("q", {"n": n})
+        assert wait_for(lambda: backend.queue_stats("q")[0] == 0)
+        assert sorted(seen) == [0, 1, 2]
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_gives_up_after_max_attempts(backend):
+    gave_up = []
+
+    def handler(payload):
+        raise ValueError("boom")
+
+    worker = run_worker(
+        backend, handler, max_attempts=1, on_give_up=lambda p, e: gave_up.append((p, str(e)))
+    )
+    try:
+        backend.enqueue("q", {"n": 1})
+        assert wait_for(lambda: gave_up)
+        assert gave_up == [({"n": 1}, "boom")]
+        assert backend.queue_stats("q")[0] == 0
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_deferred_errors_do_not_use_attempts(backend):
+    class Deferred(Exception):
+        retry_after = 0.01
+
+    calls = []
+
+    def handler(payload):
+        calls.append(1)
+        if len(calls) < 5:
+            raise Deferred()
+
+    worker = run_worker(backend, handler, max_attempts=1, defer_on=(Deferred,))
+    try:
+        backend.enqueue("q", {"n": 1})
+        assert wait_for(lambda: backend.queue_stats("q")[0] == 0)
+        assert len(calls) == 5
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_worker_survives_failed_ack(backend):
+    seen = []
+    flaky = Flaky(backend, ack=1)
+    worker = run_worker(flaky, lambda payload: seen.append(payload["n"]), lease_seconds=0.05)
+    try:
+        backend.enqueue("q", {"n": 1})
+        # the first ack fails; the job comes back after its lease and is acked then
+        assert wait_for(lambda: backend.queue_stats("q")[0] == 0)
+        backend.enqueue("q", {"n": 2})
+        assert wait_for(lambda: 2 in seen)
+        assert all(t.is_alive() for t in worker._threads)
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_worker_survives_failing_retry_and_give_up(backend):
+    def give_up(payload, error):
+        raise RuntimeError("give-up hook broke")
+
+    def handler(payload):
+        if payload["n"] == 1:
+            raise ValueError("boom")
+
+    flaky = Flaky(backend, retry=1)
+    worker = run_worker(flaky, handler, lease_seconds=0.05, max_attempts=2, on_give_up=give_up)
+    try:
+        backend.enqueue("q", {"n": 1})
+        assert wait_for(lambda: backend.queue_stats("q")[0] == 0, timeout=5)
+        backend.enqueue("q", {"n": 2})
+        assert wait_for(lambda: backend.queue_stats("q")[0] == 0)
+        assert all(t.is_alive() for t in worker._threads)
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_leader_election_and_on_elected(backend):
+    elected = threading.Event()
+    a = LeaderElector(backend, "periodic", "a", ttl_seconds=0.3, on_elected=elected.set)
+    b = LeaderElector(backend, "periodic", "b", ttl_seconds=0.3)
+    a.start()
+    try:
+        assert elected.wait(2)
+        assert a.is_leader
+        b.start()
+        time.sleep(0.2)
+        assert not b.is_leader
+
+        a.stop(timeout=2)  # releases the lease
+        assert wait_for(lambda: b.is_leader)
+    finally:
+        a.stop(timeout=2)
+        b.stop(timeout=2)
@@ -0,0 +1,61 @@
+# tests/test_events.py
+import json
+
+import pytest
+
+from events import GrabEvent, format_size, parse_json, sniff_event_type
+
+GRAB = {
+    "eventType": "Grab",
+    "instanceName": "Sonarr",
+    "downloadId": "ABCDEF0123",
+    "release": {"indexer": "idx", "releaseTitle": "Show.S01E01", "size": 3 * 1024 ** 3},
+}
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b'{"eventType": "Download", "series": {}}', "Download"),
+        (b'{"series": {"title": "x"},\n  "eventType" :"Grab"}', "Grab"),
+        (b'{"eventType": 5}', None),
+        (b"not json", None),
+        (b"", None),
+    ],
+)
+def test_sniff_event_type(body, expected):
+    assert sniff_event_type(body) == expected
+
+
+def test_parse_json_only_accepts_objects():
+    assert parse_json(b'{"a": 1}') == {"a": 1}
+    assert parse_json(b"[1, 2]") is None
+    assert parse_json(b"{broken") is None
+    assert parse_json("é".encode("latin-1")) is None
+
+
+def test_format_size():
+    assert format_size(None) == "0.00 GiB"
+    assert format_size(3 * 1024 ** 3) == "3.00 GiB"
+
+
+def test_grab_event_from_payload():
+    event = GrabEvent.from_payload(GRAB)
+    assert event.torrent_hash == "abcdef0123"  # qBittorrent uses lowercase hashes
+    assert (event.app, event.indexer, event.title) == ("Sonarr", "idx", "Show.S01E01")
+    assert event.size == "3.00 GiB"
+
+
+def test_grab_event_tolerates_missing_fields():
+    event = GrabEvent.from_payload({"eventType": "Grab", "release": None})
+    assert (event.torrent_hash, event.app, event.indexer, event.title) == ("", "", "", "")
+    assert event.size_bytes == 0
+
+    # older *Arr versions send `title` instead of `releaseTitle`
+    assert GrabEvent.from_payload({"release": {"title": "t"}}).title == "t"
+
+
+def test_grab_event_roundtrips_through_the_queue():
+    event = GrabEvent.from_payload(GRAB)
+    restored = GrabEvent.from_dict(json.loads(json.dumps(event.to_dict())))
+    assert restored.to_dict() == event.to_dict()
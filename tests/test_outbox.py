@@ -0,0 +1,83 @@
+# tests/test_outbox.py
+import time
+
+import pytest
+
+from outbox import OUTBOX_QUEUE, Outbox
+from resilience import CircuitOpenError
+
+
+def drain(backend, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if backend.queue_stats(OUTBOX_QUEUE)[0] == 0:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def make_outbox(backend):
+    outboxes = []
+
+    def make(handlers, **kwargs):
+        outbox = Outbox(backend, handlers, **kwargs)
+        outbox._worker.poll_interval = 0.01
+        outboxes.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in outboxes:
+        outbox.stop(timeout=2)
+
+
+def test_push_rejects_unknown_actions(backend, make_outbox):
+    outbox = make_outbox({"approve": lambda **kw: None})
+    with pytest.raises(ValueError, match="reject"):
+        outbox.push("reject", torrent_hash="abc")
+    assert backend.queue_stats(OUTBOX_QUEUE)[0] == 0
+
+
+def test_dispatches_with_kwargs(backend, make_outbox):
+    done = []
+    outbox = make_outbox({"approve": lambda torrent_hash: done.append(torrent_hash)})
+    outbox.push("approve", torrent_hash="abc")
+    outbox.start()
+    assert drain(backend)
+    assert done == ["abc"]
+
+
+def test_open_circuit_defers_without_giving_up(backend, make_outbox):
+    calls, gave_up = [], []
+
+    def approve(torrent_hash):
+        calls.append(torrent_hash)
+        if len(calls) < 3:
+            raise CircuitOpenError("qbittorrent", 0.01)
+
+    outbox = make_outbox(
+        {"approve": approve},
+        max_attempts=1,
+        on_give_up=lambda action, args, error: gave_up.append(action),
+    )
+    outbox.push("approve", torrent_hash="abc")
+    outbox.start()
+    assert drain(backend)
+    assert calls == ["abc"] * 3 and gave_up == []
+
+
+def test_gives_up_with_action_and_args(backend, make_outbox):
+    gave_up = []
+
+    def reject(torrent_hash):
+        raise RuntimeError("gone")
+
+    outbox = make_outbox(
+        {"reject": reject},
+        max_attempts=1,
+        on_give_up=lambda action, args, error: gave_up.append((action, args, str(error))),
+    )
+    outbox.push("reject", torrent_hash="abc")
+    outbox.start()
+    assert drain(backend)
+    assert gave_up == [("reject", {"torrent_hash": "abc"}, "gone")]
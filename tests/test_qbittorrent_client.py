@@ -0,0 +1,91 @@
+# tests/test_qbittorrent_client.py
+import json
+
+import pytest
+import requests
+
+from config import QbitConfig
+from qbittorrent_client import QbitClient
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=""):
+        self.status_code = status_code
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+
+class FakeSession:
+    """Answers by path; records every request as (method, path, data)."""
+
+    def __init__(self, **routes):
+        self.routes = routes
+        self.requests = []
+
+    def _answer(self, method, url, data):
+        path = url.split("/api/v2/", 1)[1]
+        self.requests.append((method, path, data))
+        return self.routes.get(path, FakeResponse())
+
+    def get(self, url, params=None, timeout=None):
+        return self._answer("GET", url, params)
+
+    def post(self, url, data=None, timeout=None):
+        return self._answer("POST", url, data)
+
+
+def client(session):
+    return QbitClient(QbitConfig("http://qbt", "u", "p"), session=session, _logged_in=True)
+
+
+def categories(**cats):
+    return {"torrents/categories": FakeResponse(body=cats)}
+
+
+def test_ensure_category_creates_missing():
+    session = FakeSession(**categories(tv={"name": "tv", "savePath": ""}))
+    client(session).ensure_category("gate", "/downloads/gate")
+    assert session.requests[-1] == (
+        "POST",
+        "torrents/createCategory",
+        {"category": "gate", "savePath": "/downloads/gate"},
+    )
+
+
+def test_ensure_category_syncs_save_path():
+    session = FakeSession(**categories(gate={"name": "gate", "savePath": "/old"}))
+    client(session).ensure_category("gate", "/new")
+    assert session.requests[-1][:2] == ("POST", "torrents/editCategory")
+
+
+@pytest.mark.parametrize("save_path", [None, "/same"])
+def test_ensure_category_leaves_matching_category_alone(save_path):
+    session = FakeSession(**categories(gate={"name": "gate", "savePath": "/same"}))
+    client(session).ensure_category("gate", save_path)
+    assert [r[1] for r in session.requests] == ["torrents/categories"]
+
+
+def test_ensure_category_tolerates_a_concurrent_create():
+    session = FakeSession(
+        **categories(), **{"torrents/createCategory": FakeResponse(409, "exists")}
+    )
+    client(session).ensure_category("gate")  # another worker won the race
+
+    session.routes["torrents/createCategory"] = FakeResponse(500, "boom")
+    with pytest.raises(requests.HTTPError):
+        client(session).ensure_category("gate")
+
+
+def test_release_moves_then_starts_in_one_call_each():
+    session = FakeSession()
+    client(session).release(["a", "b"], "tv")
+    assert [(r[1], r[2]["hashes"]) for r in session.requests] == [
+        ("torrents/setCategory", "a|b"),
+        ("torrents/start", "a|b"),
+    ]
@@ -0,0 +1,183 @@
+# tests/test_reconciler.py
+import time
+
+import pytest
+
+from approval_scheduler import ApprovalScheduler, PendingApproval
+from config import BehaviorConfig, GateConfig
+from qbittorrent_client import APPROVED_TAG, NEEDS_APPROVAL_TAG
+from reconciler import Reconciler
+
+
+class FakeQbit:
+    """In-memory stand-in for QbitClient; records every mutating call."""
+
+    def __init__(self, *torrents):
+        self.torrents = {t["hash"]: t for t in torrents}
+        self.calls = []
+        self.list_calls = 0
+
+    def list_all(self, tag=None, category=None, hashes=None):
+        self.list_calls += 1
+        out = list(self.torrents.values())
+        if tag is not None:
+            out = [t for t in out if tag in t["tags"].split(",")]
+        if category is not None:
+            out = [t for t in out if t.get("category") == category]
+        if hashes is not None:
+            out = [t for t in out if t["hash"] in hashes]
+        return out
+
+    def _record(self, name, hashes, *args):
+        self.calls.append((name, sorted([hashes] if isinstance(hashes, str) else hashes), *args))
+
+    def add_tags(self, hashes, tags):
+        self._record("add_tags", hashes, tags)
+
+    def remove_tag(self, hashes, tag):
+        self._record("remove_tag", hashes, tag)
+
+    def pause(self, hashes):
+        self._record("pause", hashes)
+
+    def release(self, hashes, category=None):
+        self._record("release", hashes, category)
+
+    def set_download_limit(self, hashes, limit):
+        self._record("set_download_limit", hashes, limit)
+
+    def set_upload_limit(self, hashes, limit):
+        self._record("set_upload_limit", hashes, limit)
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.sent = []
+
+    def send_approval(self, name, size, torrent_hash, indexer):
+        self.sent.append(torrent_hash)
+
+
+def torrent(h, tags=(NEEDS_APPROVAL_TAG,), state="stoppedDL", **extra):
+    return {"hash": h, "name": h, "tags": ",".join(tags), "state": state, **extra}
+
+
+@pytest.fixture
+def scheduler(backend):
+    return ApprovalScheduler(backend, lambda p: None)
+
+
+def make(qbt, scheduler, notifier=None, behavior=None, **kwargs):
+    return Reconciler(
+        qbt, scheduler, notifier, behavior or BehaviorConfig(), grace_seconds=0, **kwargs
+    )
+
+
+def test_steady_state_is_one_call(scheduler):
+    scheduler.add(PendingApproval("a", pause_torrent=True, notified=True))
+    qbt = FakeQbit(torrent("a"))
+
+    report = make(qbt, scheduler, FakeNotifier()).run_once()
+    assert report.is_empty()
+    assert qbt.list_calls == 1 and qbt.calls == []
+
+
+def test_repauses_and_renotifies_in_batches(scheduler):
+    scheduler.add(PendingApproval("a", pause_torrent=True, notified=True))
+    scheduler.add(PendingApproval("b", pause_torrent=True))
+    scheduler.add(PendingApproval("c", pause_torrent=False, notified=True))
+    qbt = FakeQbit(*(torrent(h, state="downloading") for h in "abc"))
+    notifier = FakeNotifier()
+
+    report = make(qbt, scheduler, notifier).run_once()
+    assert qbt.calls == [("pause", ["a", "b"])]
+    assert report.renotified == ["b"] and notifier.sent == ["b"]
+    assert scheduler.get("b").notified
+
+
+def test_retags_and_forgets(scheduler):
+    scheduler.add(PendingApproval("untagged", pause_torrent=True, notified=True))
+    scheduler.add(PendingApproval("gone", notified=True))
+    qbt = FakeQbit(torrent("untagged", tags=()))
+
+    report = make(qbt, scheduler).run_once()
+    assert report.retagged == ["untagged"]
+    assert report.forgotten == ["gone"]
+    assert "gone" not in scheduler
+    assert qbt.calls == [("add_tags", ["untagged"], [NEEDS_APPROVAL_TAG])]
+
+
+def test_finishes_half_applied_approval(scheduler, backend):
+    scheduler.add(PendingApproval("a", notified=True))
+    qbt = FakeQbit(torrent("a", tags=(NEEDS_APPROVAL_TAG, APPROVED_TAG)))
+
+    report = make(qbt, scheduler).run_once()
+    assert report.untagged == ["a"] and report.resumed == ["a"]
+    assert ("release", ["a"], None) in qbt.calls
+    assert backend.get_pending("a") is None
+
+
+def test_adopts_unknown_tagged_torrent(scheduler):
+    qbt = FakeQbit(torrent("orphan", state="downloading"))
+    notifier = FakeNotifier()
+    behavior = BehaviorConfig(default_on_error="deny", default_on_timeout="allow")
+
+    report = make(qbt, scheduler, notifier, behavior).run_once()
+    assert report.adopted == ["orphan"]
+    assert qbt.calls == [("pause", ["orphan"])]
+    assert notifier.sent == ["orphan"]
+
+    adopted = scheduler.get("orphan")
+    assert adopted.notified
+    # no rule context: the configured defaults apply
+    assert adopted.on_error == "deny" and adopted.on_timeout == "allow"
+
+
+def test_refreshes_links_before_they_expire(scheduler):
+    old = PendingApproval("old", notified=True, notified_at=time.time() - 1000)
+    fresh = PendingApproval("fresh", notified=True, notified_at=time.time())
+    scheduler.add(old)
+    scheduler.add(fresh)
+    qbt = FakeQbit(torrent("old"), torrent("fresh"))
+    notifier = FakeNotifier()
+
+    make(qbt, scheduler, notifier, link_ttl_seconds=1000).run_once()
+    assert notifier.sent == ["old"]
+    assert scheduler.get("old").notified_at > old.notified_at
+
+
+def test_adopts_torrents_stranded_in_gate(scheduler):
+    added = time.time() - 3600
+    qbt = FakeQbit(
+        torrent("stranded", tags=(), category="gate", progress=0, added_on=added),
+        torrent("running", tags=(), category="gate", state="downloading", added_on=added),
+        torrent("approved", tags=(APPROVED_TAG,), category="gate", added_on=added),
+    )
+    gate = GateConfig(enabled=True, category="gate")
+
+    report = make(qbt, scheduler, FakeNotifier(), gate=gate).run_once()
+    assert report.adopted == ["stranded"]
+    assert qbt.calls == [("add_tags", ["stranded"], [NEEDS_APPROVAL_TAG])]
+
+
+def test_rethrottles_only_drifted_torrents(scheduler):
+    for h in "ab":
+        scheduler.add(PendingApproval(h, hold="throttle", download_limit=100, notified=True))
+    qbt = FakeQbit(
+        torrent("a", state="downloading", dl_limit=100, up_limit=-1),
+        torrent("b", state="downloading", dl_limit=-1, up_limit=-1),
+    )
+
+    report = make(qbt, scheduler).run_once()
+    assert report.rethrottled == ["b"]
+    assert qbt.calls == [("set_download_limit", ["b"], 100), ("set_upload_limit", ["b"], 0)]
+
+
+def test_approved_throttled_torrent_gets_limits_cleared(scheduler):
+    scheduler.add(PendingApproval("a", hold="throttle", download_limit=100, notified=True))
+    qbt = FakeQbit(torrent("a", tags=(NEEDS_APPROVAL_TAG, APPROVED_TAG), dl_limit=100, up_limit=-1))
+    gate = GateConfig(enabled=True, category="gate", release_category="tv")
+
+    make(qbt, scheduler, gate=gate).run_once()
+    assert ("set_download_limit", ["a"], 0) in qbt.calls
+    assert ("release", ["a"], "tv") in qbt.calls
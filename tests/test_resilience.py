@@ -0,0 +1,103 @@
+# tests/test_resilience.py
+import pytest
+import requests
+
+from config import QbitConfig
+from qbittorrent_client import QbitClient
+from resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    guarded,
+)
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("dep", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED
+
+    # a success in between resets the count
+    breaker.call(lambda: None)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.call(lambda: None)
+    assert 0 < exc.value.retry_after <= 60
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker("dep", failure_threshold=1, reset_timeout=0)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call()  # the trial
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # everyone else waits for it
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker("dep", failure_threshold=5, reset_timeout=0)
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+    breaker.reset_timeout = 60
+    breaker._opened_at -= 60  # let the open period run out
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)  # one failed trial is enough
+    assert breaker.state == OPEN
+
+
+class DownSession:
+    """requests.Session stand-in for a qBittorrent that refuses connections."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def post(self, url, **kwargs):
+        self.requests += 1
+        raise requests.ConnectionError(f"refused: {url}")
+
+    get = post
+
+
+def test_proxy_opens_for_a_down_qbittorrent():
+    session = DownSession()
+    # logged in earlier, so login() returns without a request
+    client = QbitClient(QbitConfig("http://qbt", "u", "p"), session=session, _logged_in=True)
+    breaker = CircuitBreaker("qbittorrent", failure_threshold=3, reset_timeout=60)
+    qbt = guarded(client, breaker, passthrough=("login", "ensure_login"))
+
+    for _ in range(3):
+        qbt.login()  # must not count as a success
+        with pytest.raises(requests.ConnectionError):
+            qbt.add_tags("abc", ["x"])
+    assert breaker.state == OPEN
+
+    # from now on calls fail fast without touching the network
+    with pytest.raises(CircuitOpenError):
+        qbt.add_tags("abc", ["x"])
+    assert session.requests == 3
+
+
+def test_proxy_passes_attributes_through():
+    client = QbitClient(QbitConfig("http://qbt/", "u", "p"))
+    qbt = guarded(client, CircuitBreaker("qbittorrent"))
+    assert qbt.base_url == "http://qbt"
+    assert qbt._logged_in is False
+    assert guarded(None, CircuitBreaker("none")) is None
@@ -0,0 +1,81 @@
+# tests/test_rule_engine.py
+from config import BehaviorConfig, RuleConfig
+from rule_engine import evaluate_rules
+
+
+def rule(name, **kwargs):
+    kwargs.setdefault("apps", ["sonarr"])
+    kwargs.setdefault("indexer_matches", ["idx"])
+    return RuleConfig(name=name, **kwargs)
+
+
+def test_no_match_uses_defaults():
+    behavior = BehaviorConfig(default_on_error="deny", approval_timeout_seconds=600)
+    d = evaluate_rules([rule("r")], behavior, "radarr", "idx")
+
+    assert not d.needs_approval and not d.needs_pause
+    assert d.matched_rules == [] and d.hold is None
+    assert d.on_error == "deny"
+    assert d.approval_timeout_seconds == 600
+
+
+def test_app_match_is_case_insensitive_and_notify_false_is_skipped():
+    rules = [rule("off", notify=False), rule("on", apps=["Sonarr"])]
+    d = evaluate_rules(rules, BehaviorConfig(), "SONARR", "idx")
+    assert d.matched_rules == ["on"]
+
+
+def test_merges_matching_rules():
+    rules = [
+        rule("a", tags_to_add=["x"], approval_timeout_seconds=300, on_timeout="allow"),
+        rule("b", tags_to_add=["x", "y"], on_error="deny", approval_timeout_seconds=60),
+        rule("c", on_error="allow", on_timeout="deny"),
+    ]
+    d = evaluate_rules(rules, BehaviorConfig(default_on_timeout="allow"), "sonarr", "idx")
+
+    assert d.needs_approval
+    assert d.matched_rules == ["a", "b", "c"]
+    assert d.tags == ["x", "y"]
+    assert d.on_error == "deny"  # first rule that sets it
+    assert d.approval_timeout_seconds == 60  # shortest
+    assert d.on_timeout == "deny"  # deny wins
+
+
+def test_on_timeout_allow_only_when_all_allow():
+    rules = [rule("a", on_timeout="allow"), rule("b")]
+    allow = BehaviorConfig(default_on_timeout="allow")
+    deny = BehaviorConfig(default_on_timeout="deny")
+    assert evaluate_rules(rules, allow, "sonarr", "idx").on_timeout == "allow"
+    assert evaluate_rules(rules, deny, "sonarr", "idx").on_timeout == "deny"
+
+
+
+
+def test_legacy_pause_torrent_maps_to_hold():
+    paused = evaluate_rules([rule("p")], BehaviorConfig(), "sonarr", "idx")
+    assert paused.needs_pause and paused.hold == "pause"
+
+    unpaused = evaluate_rules([rule("n", pause_torrent=False)], BehaviorConfig(), "sonarr", "idx")
+    assert unpaused.needs_approval and not unpaused.needs_pause and unpaused.hold is None
+
+
+def test_pause_wins_over_throttle():
+    rules = [rule("t", hold="throttle"), rule("p", hold="pause")]
+    d = evaluate_rules(rules, BehaviorConfig(), "sonarr", "idx")
+    assert d.needs_pause and d.hold == "pause"
+    assert d.hold_download_limit == 0
+
+
+def test_throttle_takes_strictest_limits():
+    behavior = BehaviorConfig(hold_download_limit=1000, hold_upload_limit=0)
+    rules = [
+        rule("default", hold="throttle"),
+        rule("slow", hold="throttle", hold_download_limit=500),
+        rule("unlimited", hold="throttle", hold_download_limit=0, hold_upload_limit=0),
+        rule("up", hold="throttle", hold_upload_limit=200),
+    ]
+    d = evaluate_rules(rules, behavior, "sonarr", "idx")
+
+    assert not d.needs_pause and d.hold == "throttle"
+    assert d.hold_download_limit == 500  # 0 means unlimited, not strictest
+    assert d.hold_upload_limit == 200
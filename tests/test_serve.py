@@ -0,0 +1,57 @@
+# tests/test_serve.py
+from flask import Flask
+
+from serve import ApprovarrServer, server_options
+
+
+def test_server_options_defaults():
+    opts = server_options({})
+    assert opts["bind"] == "0.0.0.0:5001"
+    assert opts["worker_class"] == "gthread"
+    assert opts["workers"] == 2 and opts["threads"] == 8
+    assert opts["graceful_timeout"] == 30
+    assert opts["preload_app"] is True
+    assert opts["accesslog"] is None
+
+
+def test_server_options_from_config():
+    opts = server_options(
+        {
+            "host": "127.0.0.1",
+            "port": 8080,
+            "workers": 4,
+            "threads": 16,
+            "keepalive": 2,
+            "backlog": 64,
+            "timeout": 60,
+            "graceful_timeout": 20,
+            "accesslog": "-",
+        }
+    )
+    assert opts["bind"] == "127.0.0.1:8080"
+    assert (opts["workers"], opts["threads"], opts["keepalive"]) == (4, 16, 2)
+    assert (opts["backlog"], opts["timeout"], opts["graceful_timeout"]) == (64, 60, 20)
+    assert opts["accesslog"] == "-"
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+
+    def start(self):
+        self.calls.append(("start",))
+
+    def stop(self, timeout=None):
+        self.calls.append(("stop", timeout))
+
+
+def test_worker_hooks_start_and_drain_the_service():
+    application = Flask(__name__)
+    service = application.extensions["approvarr"] = FakeService()
+    server = ApprovarrServer(application, server_options({"graceful_timeout": 20}))
+
+    server.cfg.post_fork(None, None)
+    server.cfg.worker_exit(None, None)
+    # leave gunicorn a few seconds between our drain and its hard kill
+    assert service.calls == [("start",), ("stop", 15)]
+    assert server.load() is application
@@ -0,0 +1,100 @@
+# tests/test_state_backend.py
+import time
+
+from state_backend import SqliteBackend
+
+
+def test_pending_roundtrip(backend):
+    backend.put_pending("abc", 123.0, {"torrent_hash": "abc", "name": "x"})
+    assert backend.get_pending("abc") == {"torrent_hash": "abc", "name": "x"}
+    assert backend.load_pending() == [{"torrent_hash": "abc", "name": "x"}]
+
+    assert backend.delete_pending("abc") is True
+    # only the first caller wins the delete
+    assert backend.delete_pending("abc") is False
+    assert backend.get_pending("abc") is None
+
+
+def test_claim_once_expires_and_can_be_released(backend):
+    assert backend.claim_once("grab:abc", 60) is True
+    assert backend.claim_once("grab:abc", 60) is False
+
+    backend.release_claim("grab:abc")
+    assert backend.claim_once("grab:abc", 0.01) is True
+    time.sleep(0.02)
+    assert backend.claim_once("grab:abc", 60) is True
+
+
+def test_queue_fifo_and_delay(backend):
+    backend.enqueue("q", {"n": 1})
+    backend.enqueue("q", {"n": 2})
+    backend.enqueue("q", {"n": 3}, delay_seconds=60)
+
+    first = backend.dequeue("q", lease_seconds=30)
+    second = backend.dequeue("q", lease_seconds=30)
+    assert (first.payload, second.payload) == ({"n": 1}, {"n": 2})
+    assert first.attempts == 1
+    # the delayed job and the leased ones are invisible
+    assert backend.dequeue("q", lease_seconds=30) is None
+    assert backend.dequeue("other", lease_seconds=30) is None
+
+    depth, oldest = backend.queue_stats("q")
+    assert depth == 3 and oldest <= time.time()
+
+
+def test_lease_expiry_redelivers_with_attempt_count(backend):
+    backend.enqueue("q", {"n": 1})
+    job = backend.dequeue("q", lease_seconds=0.01)
+    time.sleep(0.02)
+
+    again = backend.dequeue("q", lease_seconds=30)
+    assert again.id == job.id
+    assert again.attempts == 2
+
+    backend.ack(again)
+    assert backend.queue_stats("q") == (0, None)
+
+
+def test_retry_delays_and_refunds(backend):
+    backend.enqueue("q", {"n": 1})
+    job = backend.dequeue("q", lease_seconds=30)
+
+    backend.retry(job, delay_seconds=0, refund=True)
+    job = backend.dequeue("q", lease_seconds=30)
+    assert job.attempts == 1  # refunded attempt is not counted
+
+    backend.retry(job, delay_seconds=0)
+    assert backend.dequeue("q", lease_seconds=30).attempts == 2
+
+    backend.enqueue("r", {"n": 1})
+    job = backend.dequeue("r", lease_seconds=30)
+    backend.retry(job, delay_seconds=60)
+    assert backend.dequeue("r", lease_seconds=30) is None
+
+
+def test_leases(backend):
+    assert backend.acquire_lease("periodic", "a", 30) is True
+    assert backend.acquire_lease("periodic", "a", 30) is True  # renew
+    assert backend.acquire_lease("periodic", "b", 30) is False
+
+    backend.release_lease("periodic", "b")  # not the owner: no effect
+    assert backend.acquire_lease("periodic", "b", 30) is False
+
+    backend.release_lease("periodic", "a")
+    assert backend.acquire_lease("periodic", "b", 0.01) is True
+    time.sleep(0.02)
+    assert backend.acquire_lease("periodic", "a", 30) is True
+
+
+def test_state_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    one, two = SqliteBackend(path), SqliteBackend(path)
+    try:
+        one.enqueue("q", {"n": 1})
+        assert two.dequeue("q", lease_seconds=30).payload == {"n": 1}
+        assert one.dequeue("q", lease_seconds=30) is None
+        assert one.claim_once("k", 60) is True
+        assert two.claim_once("k", 60) is False
+    finally:
+        one.close()
+        two.close()
@@ -0,0 +1,63 @@
+# tests/test_throttle.py
+from approval_scheduler import PendingApproval
+from config import BehaviorConfig
+from throttle import _fair_shares, apply_limits, hold_limits, limits_match
+
+
+def throttled(h, download=0, upload=0):
+    return PendingApproval(h, hold="throttle", download_limit=download, upload_limit=upload)
+
+
+def test_fair_shares_even_split():
+    assert _fair_shares([0, 0, 0], 300) == [100, 100, 100]
+
+
+def test_fair_shares_redistributes_below_cap():
+    assert _fair_shares([50, 0, 0], 300) == [50, 125, 125]
+    assert _fair_shares([200, 0], 300) == [150, 150]
+    assert _fair_shares([500, 600], 300) == [150, 150]
+
+
+def test_fair_shares_stay_within_budget():
+    for caps, budget in [([0] * 7, 1000), ([10, 0, 400, 0], 999), ([3, 3, 3], 10)]:
+        assert sum(_fair_shares(caps, budget)) <= budget
+
+
+def test_fair_shares_floor_is_one_byte():
+    # 0 would mean unlimited, so each torrent gets at least 1 B/s
+    assert _fair_shares([0] * 20, 5) == [1] * 20
+
+
+def test_hold_limits_without_budget_uses_rule_limits():
+    pending = [throttled("a", 100, 10), PendingApproval("p", hold="pause"), PendingApproval("old")]
+    assert hold_limits(pending, BehaviorConfig()) == {"a": (100, 10)}
+
+
+def test_hold_limits_splits_budget():
+    behavior = BehaviorConfig(hold_total_download_limit=1000)
+    pending = [throttled("a", 102400, 5), throttled("b", 100)]
+    assert hold_limits(pending, behavior) == {"a": (900, 5), "b": (100, 0)}
+
+
+def test_limits_match_treats_minus_one_as_unlimited():
+    assert limits_match({"dl_limit": -1, "up_limit": 100}, (0, 100))
+    assert not limits_match({"dl_limit": 50, "up_limit": 100}, (0, 100))
+
+
+def test_apply_limits_batches_by_value():
+    calls = []
+
+    class Qbt:
+        def set_download_limit(self, hashes, limit):
+            calls.append(("dl", sorted(hashes), limit))
+
+        def set_upload_limit(self, hashes, limit):
+            calls.append(("ul", sorted(hashes), limit))
+
+    apply_limits(Qbt(), {"a": (100, 0), "b": (100, 5), "c": (200, 0)})
+    assert sorted(calls) == [
+        ("dl", ["a", "b"], 100),
+        ("dl", ["c"], 200),
+        ("ul", ["a", "c"], 0),
+        ("ul", ["b"], 5),
+    ]
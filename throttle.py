@@ -0,0 +1,88 @@
+# throttle.py
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from approval_scheduler import PendingApproval
+from config import BehaviorConfig
+from qbittorrent_client import Hashes, QbitClient
+
+THROTTLE = "throttle"
+
+Limits = Tuple[int, int]  # (download, upload) in bytes/s, 0 = unlimited
+
+
+def is_throttled(pending: PendingApproval) -> bool:
+    return pending.hold == THROTTLE
+
+
+def _fair_shares(caps: List[int], budget: int) -> List[int]:
+    """
+    Max-min fair split of `budget` over torrents with their own caps
+    (0 = uncapped): capped torrents below the even share keep their cap and
+    the rest of the budget is split evenly among the others.
+
+    Shares never sum to more than `budget`, except that every torrent gets
+    at least 1 B/s (a 0 limit would mean unlimited to qBittorrent): with
+    more torrents than `budget` bytes/s, the total is len(caps) B/s.
+    """
+    order = sorted(range(len(caps)), key=lambda i: caps[i] or float("inf"))
+    shares = [0] * len(caps)
+    remaining = budget
+    for pos, i in enumerate(order):
+        share = max(remaining // (len(order) - pos), 1)
+        if caps[i] and caps[i] <= share:
+            shares[i] = caps[i]
+            remaining -= caps[i]
+            continue
+        for j in order[pos:]:
+            shares[j] = share
+        break
+    return shares
+
+
+def hold_limits(pending: Iterable[PendingApproval], behavior: BehaviorConfig) -> Dict[str, Limits]:
+    """
+    Limits each throttled pending torrent should have: its rule's limits,
+    capped by a fair share of the optional global budget.
+    """
+    throttled = [p for p in pending if is_throttled(p)]
+    downloads = [p.download_limit for p in throttled]
+    uploads = [p.upload_limit for p in throttled]
+    if behavior.hold_total_download_limit:
+        downloads = _fair_shares(downloads, behavior.hold_total_download_limit)
+    if behavior.hold_total_upload_limit:
+        uploads = _fair_shares(uploads, behavior.hold_total_upload_limit)
+    return {p.torrent_hash: (d, u) for p, d, u in zip(throttled, downloads, uploads)}
+
+
+def has_budget(behavior: BehaviorConfig) -> bool:
+    return bool(behavior.hold_total_download_limit or behavior.hold_total_upload_limit)
+
+
+def limits_match(torrent: Dict[str, Any], limits: Limits) -> bool:
+    """Compare with a torrents/info entry, which reports -1 for unlimited."""
+    download, upload = limits
+    return (
+        max(torrent.get("dl_limit", 0), 0) == download
+        and max(torrent.get("up_limit", 0), 0) == upload
+    )
+
+
+def apply_limits(qbt: QbitClient, limits: Dict[str, Limits]) -> None:
+    """Set limits with one multi-hash call per distinct download/upload value."""
+    by_download: Dict[int, List[str]] = defaultdict(list)
+    by_upload: Dict[int, List[str]] = defaultdict(list)
+    for torrent_hash, (download, upload) in limits.items():
+        by_download[download].append(torrent_hash)
+        by_upload[upload].append(torrent_hash)
+    for limit, hashes in by_download.items():
+        qbt.set_download_limit(hashes, limit)
+    for limit, hashes in by_upload.items():
+        qbt.set_upload_limit(hashes, limit)
+
+
+def clear_limits(qbt: QbitClient, torrent_hash: Hashes) -> None:
+    qbt.set_download_limit(torrent_hash, 0)
+    qbt.set_upload_limit(torrent_hash, 0)